@@ -13,6 +13,23 @@ is intended as a foundation.  It focuses on the following aspects:
 * basic SMART collection and pre‑filtering
 * simple normalisation and scoring according to a selected RAID profile
 * exporting aggregated results into JSON/YAML/CSV files
+* an optional I/O engine comparison (libaio, io_uring and its polled,
+  SQ-polling and registered file/buffer variants) whose winner is used for
+  the remaining tests of each device
+* optional phase tracing via ``fio_trace`` (Chrome trace JSON or summary)
+* a block size grid (``--bs``) with throughput-vs-block-size curves and
+  ``bssplit`` mixed-size workloads modelled on NFS rsize/wsize traffic
+* an adaptive queue depth x numjobs search locating each device's
+  saturation knee and its maximum IOPS under a p99 latency SLO
+* a latency-under-load QoS test running a QD1 probe next to background
+  sequential write, random write or read flood jobs of increasing depth
+* an LBA zone scan sampling short bursts across the namespace capacity to
+  find slow regions
+* replay of captured production traces through fio iologs (``fio_iolog``)
+  with fidelity reporting
+* live Prometheus metrics via ``fio_metrics`` (textfile or HTTP endpoint)
+* a filesystem mode running file based workloads and metadata rate tests
+  against mounted filesystems (e.g. the XFS from ``xfs_filesystems``)
 
 The functionality is intentionally limited – PCIe/NUMA topology analysis,
 burst/on‑off workloads and advanced stability heuristics are left as TODOs to
@@ -28,8 +45,24 @@ import os
 import shutil
 import statistics
 import subprocess
-from dataclasses import dataclass, field
-from typing import Dict, Iterable, List, Optional, Tuple
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field, replace
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from fio_iolog import (
+    IologStats,
+    convert_trace,
+    device_capacity,
+    open_trace,
+    parse_blkparse,
+    parse_bytes,
+)
+from fio_trace import TRACER, traced
+
+if TYPE_CHECKING:  # pragma: no cover - typing only
+    from fio_metrics import BenchmarkMetrics
 
 try:  # optional YAML support
     import yaml  # type: ignore
@@ -41,7 +74,59 @@ DEFAULT_RUNTIME = 60
 DEFAULT_RAMP = 10
 DEFAULT_REPEAT = 3
 DEFAULT_QD = [1, 4, 16, 32]
-DEFAULT_BS = ["4k", "128k"]
+# block size grid used when --bs is given without values
+DEFAULT_BS = ["4k", "16k", "64k", "128k", "256k", "1m"]
+# bssplit mixes approximating NFS traffic (size/percent of I/Os)
+NFS_BSSPLIT = {
+    # metadata heavy home directories: small reads/writes dominate
+    "nfs_small": "4k/50:8k/15:32k/15:128k/10:1m/10",
+    # streaming clients using the default 1M rsize/wsize
+    "nfs_stream": "4k/5:64k/10:256k/15:1m/70",
+}
+DEFAULT_ENGINE = "io_uring"
+# fio options for each I/O engine variant compared by ``--engines``
+ENGINES: Dict[str, Dict[str, str]] = {
+    "libaio": {"ioengine": "libaio"},
+    "io_uring": {"ioengine": "io_uring"},
+    # polled completions, requires nvme poll_queues (perf_nvme_poll_queues)
+    "io_uring_hipri": {"ioengine": "io_uring", "hipri": "1"},
+    "io_uring_sqpoll": {"ioengine": "io_uring", "sqthread_poll": "1"},
+    "io_uring_fixed": {"ioengine": "io_uring", "registerfiles": "1", "fixedbufs": "1"},
+}
+# engines within this fraction of the best IOPS are ranked by CPU cost
+ENGINE_IOPS_TOLERANCE = 0.05
+# filesystem mode: scratch directory created below each mountpoint
+FS_WORKDIR = ".xitools_fio"
+DEFAULT_FS_FILES = 1024
+DEFAULT_FS_STREAM = "16g"
+FS_FILE_SIZE = 1 << 20  # bytes per file of the many-file tests
+# test file layouts may use at most this fraction of the free space
+FS_SPACE_FRACTION = 0.5
+DEFAULT_META_FILES = 10000
+# saturation search: outstanding I/O is split into jobs of at most this depth
+KNEE_QD_PER_JOB = 32
+KNEE_MAX_DEPTH = 1024
+# the knee is the smallest depth reaching this fraction of the plateau IOPS
+KNEE_FRACTION = 0.95
+DEFAULT_LATENCY_SLO_MS = 1.0
+# zone scan: bursts at evenly spaced offsets, several zones at a time
+ZONE_COUNT = 64
+ZONE_BURST = 2  # seconds per zone
+ZONE_CONCURRENCY = 4
+ZONE_SPAN = 1 << 30  # bytes exercised inside each zone
+ZONE_ALIGN = 1 << 20
+# a zone is an outlier below this fraction of the median bandwidth or
+# above this multiple of the median p99 latency
+ZONE_OUTLIER_BW = 0.8
+ZONE_OUTLIER_LAT = 3.0
+# QoS test: background workloads (rw, bs, needs --allow-write) and total
+# background depths run next to a QD1 random read probe
+QOS_BACKGROUND: Dict[str, Tuple[str, str, bool]] = {
+    "seq_write": ("write", "128k", True),
+    "rand_write": ("randwrite", "4k", True),
+    "read_flood": ("randread", "4k", False),
+}
+QOS_DEPTHS = [4, 16, 64, 256]
 
 # --------------------------- data structures -------------------------------
 
@@ -72,6 +157,42 @@ class FioResult:
     bw_cov: float = 0.0
     iops_std: float = 0.0
     iops_cov: float = 0.0
+    # fio user/system CPU utilisation in percent and context switches
+    cpu_usr: float = 0.0
+    cpu_sys: float = 0.0
+    ctx: float = 0.0
+    # host CPU cores kept busy during the run and derived efficiency
+    cpu_cores: float = 0.0
+    iops_per_core: float = 0.0
+    cpu_us_per_io: float = 0.0
+    # achieved / recorded I/O rate of iolog replays
+    replay_fidelity: float = 0.0
+    # metadata operations per second (filesystem mode only)
+    meta_ops: Dict[str, float] = field(default_factory=dict)
+
+
+@dataclass
+class ZoneResult:
+    """Throughput/latency of one LBA zone of a namespace."""
+
+    index: int
+    offset: int  # bytes
+    rw: str
+    bw: float = 0.0
+    iops: float = 0.0
+    lat_p99: float = 0.0
+    outlier: bool = False
+
+
+@dataclass
+class QosPoint:
+    """Probe latency measured at one background load level."""
+
+    depth: int  # total background queue depth that ran (qd * numjobs)
+    bg_bw: float  # MiB/s
+    bg_iops: float
+    probe_p99: float  # ms
+    probe_p999: float  # ms
 
 
 @dataclass
@@ -83,6 +204,17 @@ class DeviceReport:
     results: Dict[str, FioResult] = field(default_factory=dict)
     score: float = 0.0
     reasons: List[str] = field(default_factory=list)
+    engine: str = DEFAULT_ENGINE
+    # engine_<name> runs of the I/O engine comparison, kept out of scoring
+    engine_results: Dict[str, FioResult] = field(default_factory=dict)
+    numa_node: int = -1
+    # knee/SLO operating points found by the saturation search
+    saturation: Dict[str, Any] = field(default_factory=dict)
+    # workload -> block size -> MiB/s from the block size grid
+    bs_curves: Dict[str, Dict[str, float]] = field(default_factory=dict)
+    zones: List[ZoneResult] = field(default_factory=list)
+    # background workload -> probe latency curve of the QoS test
+    qos: Dict[str, List[QosPoint]] = field(default_factory=dict)
 
 
 # --------------------------- SMART helpers ---------------------------------
@@ -96,6 +228,7 @@ SMART_FIELDS = {
 }
 
 
+@traced("collect_smart", lambda dev: {"dev": dev})
 def collect_smart(dev: str) -> Dict[str, int]:
     """Return subset of SMART data for *dev* using ``nvme smart-log``."""
     if shutil.which("nvme") is None:
@@ -115,6 +248,21 @@ def collect_smart(dev: str) -> Dict[str, int]:
     return data
 
 
+def numa_node(dev: str) -> int:
+    """Return the NUMA node of the controller behind *dev* (-1 if unknown)."""
+    name = os.path.basename(dev)
+    for path in (
+        f"/sys/block/{name}/device/numa_node",
+        f"/sys/block/{name}/device/device/numa_node",
+    ):
+        try:
+            with open(path) as fh:
+                return int(fh.read().strip())
+        except (OSError, ValueError):
+            continue
+    return -1
+
+
 def smart_prefilter(report: DeviceReport) -> None:
     """Apply basic SMART based filtering and annotate *report.reasons*."""
     s = report.smart
@@ -133,14 +281,30 @@ def smart_prefilter(report: DeviceReport) -> None:
 # --------------------------- fio helpers -----------------------------------
 
 
-def _fio_cmd(dev: str, name: str, rw: str, bs: str, qd: int, **extra: str) -> List[str]:
-    """Construct fio command list."""
-    ioengine = "io_uring" if shutil.which("fio") else "libaio"
+def _fio_cmd(
+    dev: str,
+    name: str,
+    rw: str,
+    bs: str,
+    qd: int,
+    target: str = "filename",
+    **extra: str,
+) -> List[str]:
+    """Construct fio command list.
+
+    *target* selects how *dev* is passed to fio: ``filename`` for block
+    devices or ``directory`` for file based workloads on a filesystem.
+    """
+    ioengine = extra.pop("ioengine", DEFAULT_ENGINE)
+    direct = extra.pop("direct", "1")
+    runtime = extra.pop("runtime", DEFAULT_RUNTIME)
+    ramp = extra.pop("ramp_time", DEFAULT_RAMP)
+    time_based = extra.pop("time_based", "1")
     cmd = [
         "fio",
         "--name",
         name,
-        "--filename",
+        f"--{target}",
         dev,
         "--rw",
         rw,
@@ -148,10 +312,10 @@ def _fio_cmd(dev: str, name: str, rw: str, bs: str, qd: int, **extra: str) -> Li
         f"--iodepth={qd}",
         "--ioengine",
         ioengine,
-        "--direct=1",
-        f"--runtime={DEFAULT_RUNTIME}",
-        f"--ramp_time={DEFAULT_RAMP}",
-        "--time_based=1",
+        f"--direct={direct}",
+        f"--runtime={runtime}",
+        f"--ramp_time={ramp}",
+        f"--time_based={time_based}",
         "--output-format=json",
         "--group_reporting=1",
     ]
@@ -173,18 +337,28 @@ class FioTest:
     qd: int
     rwmixread: Optional[int] = None
     extra: Dict[str, str] = field(default_factory=dict)
+    target: str = "filename"
+    engine: Optional[str] = None
 
     def build_cmd(self, dev: str) -> List[str]:
-        params = dict(self.extra)
+        params = dict(ENGINES[self.engine]) if self.engine else {}
+        params.update(self.extra)
         if self.rwmixread is not None:
             params["rwmixread"] = str(self.rwmixread)
-        return _fio_cmd(dev, self.name, self.rw, self.bs, self.qd, **params)
+        return _fio_cmd(
+            dev, self.name, self.rw, self.bs, self.qd, target=self.target, **params
+        )
 
 
 # test matrix ---------------------------------------------------------------
 
 
-def build_test_matrix(allow_write: bool, qd_sweep: List[int]) -> List[FioTest]:
+def build_test_matrix(
+    allow_write: bool,
+    qd_sweep: List[int],
+    block_sizes: Optional[List[str]] = None,
+    bssplits: Optional[Dict[str, str]] = None,
+) -> List[FioTest]:
     tests: List[FioTest] = []
     # Sequential tests
     tests.append(FioTest("seq_read", "read", "128k", 32))
@@ -202,10 +376,215 @@ def build_test_matrix(allow_write: bool, qd_sweep: List[int]) -> List[FioTest]:
     tests.append(FioTest("latency_read", "read", "4k", 1))
     if allow_write:
         tests.append(FioTest("latency_write", "write", "4k", 1))
+    # Block size grid
+    for bs in block_sizes or []:
+        tests.append(FioTest(f"seq_read_bs{bs}", "read", bs, 32))
+        tests.append(FioTest(f"rand_read_bs{bs}", "randread", bs, 32))
+        if allow_write:
+            tests.append(FioTest(f"seq_write_bs{bs}", "write", bs, 32))
+            tests.append(FioTest(f"rand_write_bs{bs}", "randwrite", bs, 32))
+            tests.append(FioTest(f"mixed_70_30_bs{bs}", "randrw", bs, 32, rwmixread=70))
+    # Mixed size workloads
+    for name, split in (bssplits or {}).items():
+        extra = {"bssplit": split}
+        if allow_write:
+            tests.append(FioTest(f"bssplit_{name}", "randrw", "4k", 32, rwmixread=70, extra=extra))
+        else:
+            tests.append(FioTest(f"bssplit_{name}", "randread", "4k", 32, extra=extra))
     # TODO: burst/on-off workload
     return tests
 
 
+def bssplit_from_histogram(hist: Dict[int, int], min_percent: int = 1) -> str:
+    """Return a fio ``bssplit`` spec from a request size histogram.
+
+    *hist* maps request size in bytes to I/O count.  Sizes are rounded up to
+    powers of two (at least 4k), buckets under *min_percent* are dropped and
+    the remainder is assigned to the most common size so the total is 100.
+    """
+    buckets: Dict[int, int] = {}
+    for size, count in hist.items():
+        bucket = max(4096, 1 << max(size - 1, 0).bit_length())
+        buckets[bucket] = buckets.get(bucket, 0) + count
+    total = sum(buckets.values())
+    if not total:
+        return ""
+    percents = {b: c * 100 // total for b, c in buckets.items()}
+    percents = {b: p for b, p in percents.items() if p >= min_percent}
+    top = max(buckets, key=buckets.get)
+    percents[top] = percents.get(top, 0) + 100 - sum(percents.values())
+    return ":".join(f"{_fmt_bs(b)}/{p}" for b, p in sorted(percents.items()))
+
+
+def _fmt_bs(size: int) -> str:
+    for unit, shift in (("m", 20), ("k", 10)):
+        if size % (1 << shift) == 0:
+            return f"{size >> shift}{unit}"
+    return str(size)
+
+
+def bssplit_from_trace(trace: str) -> str:
+    """Stream blkparse *trace* and return a ``bssplit`` from its request sizes."""
+    hist: Dict[int, int] = {}
+    with open_trace(trace) as fh:
+        for ev in parse_blkparse(fh):
+            hist[ev.length] = hist.get(ev.length, 0) + 1
+    return bssplit_from_histogram(hist)
+
+
+def bs_curves(results: Dict[str, FioResult]) -> Dict[str, Dict[str, float]]:
+    """Group ``<workload>_bs<size>`` results into per-workload MiB/s curves."""
+    curves: Dict[str, Dict[str, float]] = {}
+    for name, result in results.items():
+        workload, sep, bs = name.rpartition("_bs")
+        if sep and workload:
+            curves.setdefault(workload, {})[bs] = result.bw
+    return curves
+
+
+def build_engine_matrix(engines: Iterable[str], qd: int = 32) -> List[FioTest]:
+    """Return one 4k random read test per I/O engine in *engines*."""
+    return [
+        FioTest(f"engine_{name}", "randread", "4k", qd, engine=name) for name in engines
+    ]
+
+
+def select_engine(results: Dict[str, FioResult]) -> Optional[str]:
+    """Return the best engine from ``engine_<name>`` *results*.
+
+    The engine with the highest IOPS wins; engines within
+    ``ENGINE_IOPS_TOLERANCE`` of it are ranked by CPU cost per I/O (fio CPU
+    utilisation when unavailable) and then by median latency so a cheaper
+    engine is preferred when it keeps up.
+    """
+    engines = {
+        k[len("engine_"):]: r for k, r in results.items() if k.startswith("engine_") and r.iops
+    }
+    if not engines:
+        return None
+    best_iops = max(r.iops for r in engines.values())
+    close = [
+        (r.cpu_us_per_io or r.cpu_usr + r.cpu_sys, r.lat_p50, name)
+        for name, r in engines.items()
+        if r.iops >= best_iops * (1 - ENGINE_IOPS_TOLERANCE)
+    ]
+    return min(close)[2]
+
+
+def build_replay_test(
+    trace: str, dev: str, allow_write: bool, time_scale: float = 1.0
+) -> Tuple[FioTest, IologStats]:
+    """Convert blkparse *trace* into an iolog remapped onto *dev*.
+
+    Returns the replay test and the recorded statistics used to compute
+    replay fidelity.  Without *allow_write* only reads are replayed.  The
+    iolog is a unique temporary file named by the test's ``read_iolog``;
+    the caller removes it after the run.
+    """
+    fd, iolog = tempfile.mkstemp(
+        prefix=f"xitools_replay_{os.path.basename(dev)}.", suffix=".iolog"
+    )
+    os.close(fd)
+    try:
+        target_size: Optional[int] = device_capacity(dev)
+    except (OSError, ValueError):
+        target_size = None
+    try:
+        stats = convert_trace(
+            trace,
+            iolog,
+            dev,
+            target_size=target_size,
+            time_scale=time_scale,
+            reads_only=not allow_write,
+        )
+    except BaseException:
+        os.unlink(iolog)
+        raise
+    # the iolog drives offsets, sizes and timing; run it exactly once
+    extra = {"read_iolog": iolog, "time_based": "0", "runtime": "0", "ramp_time": "0"}
+    return FioTest("replay", "randrw", "4k", 32, extra=extra), stats
+
+
+def build_fs_test_matrix(
+    allow_write: bool,
+    direct: bool = True,
+    stream_size: str = DEFAULT_FS_STREAM,
+    nfiles: int = DEFAULT_FS_FILES,
+    runtime: Optional[int] = None,
+) -> List[FioTest]:
+    """Return file based workloads for a mounted filesystem.
+
+    Tests are run with ``directory`` pointing below the mountpoint.  Set
+    *direct* to ``False`` for filesystems without O_DIRECT support (tmpfs).
+    *stream_size*, *nfiles* and *runtime* allow short runs on small scratch
+    filesystems.  Read and write tests share their files, so fio lays out
+    the stream file and the many-file set once (see :func:`fs_layout`).
+    """
+    d = "1" if direct else "0"
+    stream = {
+        "size": stream_size,
+        "nrfiles": "1",
+        "filename_format": "fs_stream.$filenum",
+        "direct": d,
+    }
+    many = {
+        "size": f"{nfiles * FS_FILE_SIZE}",
+        "nrfiles": str(nfiles),
+        "filename_format": "fs_many.$filenum",
+        "openfiles": "64",
+        "file_service_type": "random",
+        "direct": d,
+    }
+    if runtime is not None:
+        timing = {"runtime": str(runtime), "ramp_time": str(min(DEFAULT_RAMP, runtime // 5))}
+        stream.update(timing)
+        many.update(timing)
+    tests: List[FioTest] = []
+    # Large sequential streams
+    tests.append(FioTest("fs_seq_read", "read", "1m", 32, extra=stream, target="directory"))
+    if allow_write:
+        tests.append(
+            FioTest("fs_seq_write", "write", "1m", 32, extra=stream, target="directory")
+        )
+    # Many-file directories
+    tests.append(
+        FioTest("fs_manyfiles_read", "randread", "128k", 16, extra=many, target="directory")
+    )
+    if allow_write:
+        tests.append(
+            FioTest(
+                "fs_manyfiles_write", "randwrite", "128k", 16, extra=many, target="directory"
+            )
+        )
+        # fsync after every write, as issued by NFS COMMIT heavy clients
+        fsync = dict(many, fsync="1")
+        tests.append(
+            FioTest("fs_fsync_write", "randwrite", "4k", 1, extra=fsync, target="directory")
+        )
+    return tests
+
+
+def fs_layout(
+    mountpoint: str, stream_size: str = DEFAULT_FS_STREAM, nfiles: int = DEFAULT_FS_FILES
+) -> Tuple[int, int]:
+    """Return ``(stream bytes, nfiles)`` fitting the free space of *mountpoint*.
+
+    Both are scaled down proportionally when the stream file and the
+    many-file set would use more than ``FS_SPACE_FRACTION`` of the space
+    available below *mountpoint*.
+    """
+    stream = parse_bytes(stream_size)
+    st = os.statvfs(mountpoint)
+    budget = int(st.f_bavail * st.f_frsize * FS_SPACE_FRACTION)
+    need = stream + nfiles * FS_FILE_SIZE
+    if need > budget:
+        scale = budget / need
+        stream = max(int(stream * scale) // FS_FILE_SIZE, 1) * FS_FILE_SIZE
+        nfiles = max(int(nfiles * scale), 1)
+    return stream, nfiles
+
+
 # --------------------------- execution -------------------------------------
 
 
@@ -213,41 +592,136 @@ class FioRuntimeError(RuntimeError):
     """Raised when fio execution fails."""
 
 
-def _run_fio_once(cmd: List[str]) -> Dict[str, float]:
-    """Execute fio command and return basic metrics."""
+def _read_cpu_times() -> Optional[Tuple[int, int]]:
+    """Return ``(busy, total)`` jiffies summed over all CPUs from /proc/stat."""
+    try:
+        with open("/proc/stat") as fh:
+            fields = [int(v) for v in fh.readline().split()[1:9]]
+    except (OSError, ValueError):
+        return None
+    # user nice system idle iowait irq softirq steal
+    busy = sum(fields) - fields[3] - fields[4]
+    return busy, sum(fields)
+
+
+def _cpu_efficiency(result: Dict[str, float]) -> None:
+    """Add ``iops_per_core`` and ``cpu_us_per_io`` derived from ``cpu_cores``."""
+    cores, iops = result.get("cpu_cores", 0.0), result.get("iops", 0.0)
+    result["iops_per_core"] = iops / cores if cores else 0.0
+    result["cpu_us_per_io"] = cores * 1e6 / iops if iops else 0.0
+
+
+def _trace_fio_phases(job: Dict, start: float, duration: float) -> None:
+    """Split a fio process span into startup, ramp and measured I/O phases.
+
+    fio reports ``elapsed`` (seconds since the job started, including ramp)
+    and ``job_runtime`` (measured milliseconds); the remainder of the process
+    lifetime is attributed to process startup and teardown.
+    """
+    elapsed = float(job.get("elapsed", 0))
+    io = job.get("job_runtime", 0) / 1000.0
+    if not elapsed:
+        return
+    startup = max(duration - elapsed, 0.0)
+    ramp = max(elapsed - io, 0.0)
+    TRACER.record("fio.startup", start, startup)
+    TRACER.record("fio.ramp", start + startup, ramp)
+    TRACER.record("fio.io", start + startup + ramp, min(io, elapsed))
+
+
+# fio percentile keys -> sample keys
+_PERCENTILES = {"50.000000": "p50", "90.000000": "p90", "99.000000": "p99", "99.900000": "p99.9"}
+
+
+def _exec_fio(cmd: List[str]) -> Dict[str, Any]:
+    """Run fio *cmd* and return its parsed JSON output."""
     try:
-        out = subprocess.check_output(cmd, text=True, stderr=subprocess.STDOUT)
+        with TRACER.span("fio.process"):
+            out = subprocess.check_output(cmd, text=True, stderr=subprocess.STDOUT)
     except subprocess.CalledProcessError as exc:
         raise FioRuntimeError(exc.output.strip()) from exc
-    data = json.loads(out)
-    job = data.get("jobs", [{}])[0]
+    with TRACER.span("fio.parse"):
+        return json.loads(out)
+
+
+def _job_metrics(job: Dict) -> Dict[str, float]:
+    """Return bandwidth, IOPS, latency and fio CPU figures of one fio job."""
     result: Dict[str, float] = {}
-    if "read" in job:
-        r = job["read"]
-    else:
-        r = job["write"]
-    result["bw"] = r.get("bw", 0) / 1024.0  # convert KiB/s -> MiB/s
-    result["iops"] = r.get("iops", 0)
+    # fio always reports both directions; use the busier one for latency and
+    # sum bandwidth so write-only and mixed jobs are not reported as zero
+    dirs = [job[k] for k in ("read", "write") if k in job] or [{}]
+    r = max(dirs, key=lambda d: d.get("total_ios", d.get("io_bytes", 0)))
+    result["bw"] = sum(d.get("bw", 0) for d in dirs) / 1024.0  # KiB/s -> MiB/s
+    result["iops"] = sum(d.get("iops", 0) for d in dirs)
     lat_ns = r.get("clat_ns", {})
-    for p in ("50.000000", "90.000000", "99.000000", "99.900000"):
+    for p, key in _PERCENTILES.items():
         if p in lat_ns.get("percentile", {}):
-            result[f"p{p.split('.')[0]}"] = lat_ns["percentile"][p] / 1e6
+            result[key] = lat_ns["percentile"][p] / 1e6
     result["max"] = lat_ns.get("max", 0) / 1e6
+    result["usr_cpu"] = job.get("usr_cpu", 0.0)
+    result["sys_cpu"] = job.get("sys_cpu", 0.0)
+    result["ctx"] = job.get("ctx", 0)
+    return result
+
+
+@traced("_run_fio_once")
+def _run_fio_once(cmd: List[str]) -> Dict[str, float]:
+    """Execute fio command and return basic metrics."""
+    before = _read_cpu_times()
+    start = time.perf_counter()
+    data = _exec_fio(cmd)
+    after = _read_cpu_times()
+    job = data.get("jobs", [{}])[0]
+    if TRACER.enabled:
+        _trace_fio_phases(job, start, time.perf_counter() - start)
+    result = _job_metrics(job)
+    # /proc/stat also accounts interrupt and softirq completion work that fio
+    # does not see; fall back to fio's own figures when it is unavailable
+    if before and after and after[1] > before[1]:
+        share = (after[0] - before[0]) / (after[1] - before[1])
+        result["cpu_cores"] = share * (os.cpu_count() or 1)
+    else:
+        result["cpu_cores"] = (result["usr_cpu"] + result["sys_cpu"]) / 100.0
+    _cpu_efficiency(result)
     return result
 
 
-def run_test(dev: str, test: FioTest, repeat: int, dry_run: bool = False) -> FioResult:
+@traced("run_test", lambda dev, test, *args, **kwargs: {"dev": dev, "test": test.name})
+def run_test(
+    dev: str,
+    test: FioTest,
+    repeat: int,
+    dry_run: bool = False,
+    metrics: Optional[BenchmarkMetrics] = None,
+    label: Optional[str] = None,
+) -> FioResult:
+    """Run *test* *repeat* times on *dev* and aggregate the samples.
+
+    Samples are published to *metrics* under the device *label*, which
+    defaults to *dev*.
+    """
     bw_samples: List[float] = []
     iops_samples: List[float] = []
+    usr_samples: List[float] = []
+    sys_samples: List[float] = []
+    ctx_samples: List[float] = []
+    core_samples: List[float] = []
     lat_p50 = lat_p90 = lat_p99 = lat_p999 = lat_max = 0.0
     for _ in range(repeat):
+        start = time.monotonic()
         if dry_run:
             sample = {"bw": 0, "iops": 0}
         else:
             cmd = test.build_cmd(dev)
             sample = _run_fio_once(cmd)
+        if metrics is not None:
+            metrics.sample(label or dev, test.name, sample, time.monotonic() - start)
         bw_samples.append(sample.get("bw", 0.0))
         iops_samples.append(sample.get("iops", 0.0))
+        usr_samples.append(sample.get("usr_cpu", 0.0))
+        sys_samples.append(sample.get("sys_cpu", 0.0))
+        ctx_samples.append(sample.get("ctx", 0.0))
+        core_samples.append(sample.get("cpu_cores", 0.0))
         lat_p50 = sample.get("p50", lat_p50)
         lat_p90 = sample.get("p90", lat_p90)
         lat_p99 = sample.get("p99", lat_p99)
@@ -257,6 +731,8 @@ def run_test(dev: str, test: FioTest, repeat: int, dry_run: bool = False) -> Fio
     iops_mean, iops_std = _mean_std(iops_samples)
     bw_cov = (bw_std / bw_mean) * 100 if bw_mean else 0.0
     iops_cov = (iops_std / iops_mean) * 100 if iops_mean else 0.0
+    eff = {"iops": iops_mean, "cpu_cores": _mean_std(core_samples)[0]}
+    _cpu_efficiency(eff)
     return FioResult(
         bw=bw_mean,
         iops=iops_mean,
@@ -269,9 +745,313 @@ def run_test(dev: str, test: FioTest, repeat: int, dry_run: bool = False) -> Fio
         bw_cov=bw_cov,
         iops_std=iops_std,
         iops_cov=iops_cov,
+        cpu_usr=_mean_std(usr_samples)[0],
+        cpu_sys=_mean_std(sys_samples)[0],
+        ctx=_mean_std(ctx_samples)[0],
+        cpu_cores=eff["cpu_cores"],
+        iops_per_core=eff["iops_per_core"],
+        cpu_us_per_io=eff["cpu_us_per_io"],
+    )
+
+
+def run_metadata_test(
+    mountpoint: str, nfiles: int = DEFAULT_META_FILES, repeat: int = 1, dry_run: bool = False
+) -> FioResult:
+    """Measure small-file create/stat/unlink rates below *mountpoint*.
+
+    Returns a :class:`FioResult` whose ``iops`` is the mean rate over all
+    operations and ``meta_ops`` holds the per-operation rates in ops/s.
+    """
+    if dry_run:
+        return FioResult(bw=0.0, iops=0.0, meta_ops={"create": 0.0, "stat": 0.0, "unlink": 0.0})
+    workdir = os.path.join(mountpoint, FS_WORKDIR, "meta")
+    os.makedirs(workdir, exist_ok=True)
+    samples: Dict[str, List[float]] = {"create": [], "stat": [], "unlink": []}
+    totals: List[float] = []
+    paths = [os.path.join(workdir, f"f{i:07d}") for i in range(nfiles)]
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for p in paths:
+            os.close(os.open(p, os.O_CREAT | os.O_WRONLY, 0o644))
+        t_create = time.perf_counter()
+        for p in paths:
+            os.stat(p)
+        t_stat = time.perf_counter()
+        for p in paths:
+            os.unlink(p)
+        t_unlink = time.perf_counter()
+        for op, elapsed in (
+            ("create", t_create - start),
+            ("stat", t_stat - t_create),
+            ("unlink", t_unlink - t_stat),
+        ):
+            samples[op].append(nfiles / elapsed if elapsed > 0 else 0.0)
+        elapsed = t_unlink - start
+        totals.append(3 * nfiles / elapsed if elapsed > 0 else 0.0)
+    meta_ops = {op: _mean_std(vals)[0] for op, vals in samples.items()}
+    iops_mean, iops_std = _mean_std(totals)
+    return FioResult(
+        bw=0.0,
+        iops=iops_mean,
+        iops_std=iops_std,
+        iops_cov=(iops_std / iops_mean) * 100 if iops_mean else 0.0,
+        meta_ops=meta_ops,
     )
 
 
+# --------------------------- saturation search -----------------------------
+
+
+@dataclass
+class OperatingPoint:
+    """Measured throughput/latency at a given queue depth and job count."""
+
+    qd: int
+    numjobs: int
+    iops: float
+    lat_p99: float
+
+    @property
+    def depth(self) -> int:
+        return self.qd * self.numjobs
+
+
+def depth_to_jobs(depth: int) -> Tuple[int, int]:
+    """Split *depth* outstanding I/Os into ``(qd, numjobs)``.
+
+    A single job is used up to ``KNEE_QD_PER_JOB``; deeper points add jobs
+    so one submitting thread does not become the bottleneck.
+    """
+    if depth <= KNEE_QD_PER_JOB:
+        return depth, 1
+    return KNEE_QD_PER_JOB, depth // KNEE_QD_PER_JOB
+
+
+def find_saturation(
+    measure: Callable[[int, int], FioResult],
+    slo_ms: float = DEFAULT_LATENCY_SLO_MS,
+    max_depth: int = KNEE_MAX_DEPTH,
+) -> Dict[str, Any]:
+    """Locate the saturation knee and the best point under a p99 SLO.
+
+    Total depth is searched on a power-of-two scale: a coarse 4x sweep runs
+    until IOPS stop growing by more than ``1 - KNEE_FRACTION``, then
+    bisection on the exponent finds the smallest depth within
+    ``KNEE_FRACTION`` of the plateau (the knee) and the largest depth whose
+    p99 latency stays within *slo_ms*.  *measure* runs one workload for
+    ``(qd, numjobs)``.  Returns the ``knee`` and ``slo`` points as plain
+    dicts for the report plus the number of ``runs`` performed.
+    """
+    points: Dict[int, OperatingPoint] = {}
+
+    def probe(k: int) -> OperatingPoint:
+        if k not in points:
+            qd, jobs = depth_to_jobs(2 ** k)
+            res = measure(qd, jobs)
+            points[k] = OperatingPoint(qd, jobs, res.iops, res.lat_p99)
+        return points[k]
+
+    k_max = max(int(math.log2(max_depth)), 0)
+    # coarse sweep: 1, 4, 16, ... until the curve flattens
+    k, prev = 0, probe(0)
+    while k + 2 <= k_max:
+        k += 2
+        cur = probe(k)
+        if cur.iops < prev.iops / KNEE_FRACTION:
+            break
+        prev = cur
+    plateau = max(p.iops for p in points.values())
+
+    # knee: smallest exponent reaching KNEE_FRACTION of the plateau
+    target = plateau * KNEE_FRACTION
+    hi = min(e for e, p in points.items() if p.iops >= target)
+    lo = max((e for e, p in points.items() if e < hi and p.iops < target), default=-1)
+    while hi - lo > 1:
+        mid = (lo + hi) // 2
+        if probe(mid).iops >= target:
+            hi = mid
+        else:
+            lo = mid
+    result: Dict[str, Any] = {"knee": asdict(points[hi])}
+
+    # SLO: p99 grows with depth, bisect for the last depth meeting it
+    if probe(0).lat_p99 <= slo_ms:
+        lo = max(e for e, p in points.items() if p.lat_p99 <= slo_ms)
+        hi = min((e for e, p in points.items() if e > lo and p.lat_p99 > slo_ms), default=lo + 1)
+        while hi - lo > 1:
+            mid = (lo + hi) // 2
+            if probe(mid).lat_p99 <= slo_ms:
+                lo = mid
+            else:
+                hi = mid
+        result["slo"] = asdict(points[lo])
+    result["runs"] = len(points)
+    return result
+
+
+def build_knee_test(qd: int, numjobs: int) -> FioTest:
+    """Return the 4k random read workload used by the saturation search."""
+    extra = {"numjobs": str(numjobs)} if numjobs > 1 else {}
+    return FioTest(f"knee_qd{qd}_j{numjobs}", "randread", "4k", qd, extra=extra)
+
+
+def apply_knee(tests: List[FioTest], saturation: Dict[str, Any]) -> List[FioTest]:
+    """Run random/mixed tests outside the QD sweep at the knee point."""
+    knee = saturation.get("knee")
+    if not knee:
+        return tests
+    qd, jobs = int(knee["qd"]), int(knee["numjobs"])
+    tuned: List[FioTest] = []
+    for test in tests:
+        # QD sweep and block size grid keep their fixed depth for comparability
+        sweep = "_qd" in test.name or "_bs" in test.name
+        if test.rw.startswith("rand") and not sweep and test.qd > 1:
+            extra = dict(test.extra)
+            if jobs > 1:
+                extra["numjobs"] = str(jobs)
+            test = replace(test, qd=qd, extra=extra)
+        tuned.append(test)
+    return tuned
+
+
+# --------------------------- zone scan -------------------------------------
+
+
+def build_zone_tests(
+    capacity: int, zones: int = ZONE_COUNT, rw: str = "read", burst: int = ZONE_BURST
+) -> List[FioTest]:
+    """Return one short sequential burst per zone spread over *capacity*.
+
+    Each burst covers at most ``ZONE_SPAN`` bytes at the start of its zone,
+    so scan time depends on *zones* and *burst*, not on the drive size.
+    """
+    stride = capacity // zones // ZONE_ALIGN * ZONE_ALIGN
+    span = min(ZONE_SPAN, stride)
+    if span <= 0:
+        return []
+    timing = {"runtime": str(burst), "ramp_time": "0"}
+    return [
+        FioTest(
+            f"zone{i}_{rw}",
+            rw,
+            "128k",
+            32,
+            extra=dict(timing, offset=str(i * stride), size=str(span)),
+        )
+        for i in range(zones)
+    ]
+
+
+def scan_zones(
+    dev: str,
+    tests: List[FioTest],
+    concurrency: int = ZONE_CONCURRENCY,
+    dry_run: bool = False,
+) -> List[ZoneResult]:
+    """Run zone *tests* on *dev*, *concurrency* zones at a time.
+
+    Read and write zones are scanned in separate passes.  Concurrent zones
+    share the device, but within a pass they only compete with bursts of
+    the same kind, so their results remain comparable.
+    """
+
+    def run(idx_test: Tuple[int, FioTest]) -> ZoneResult:
+        idx, test = idx_test
+        zone = ZoneResult(idx, int(test.extra["offset"]), test.rw)
+        if not dry_run:
+            sample = _run_fio_once(test.build_cmd(dev))
+            zone.bw, zone.iops = sample.get("bw", 0.0), sample.get("iops", 0.0)
+            zone.lat_p99 = sample.get("p99", 0.0)
+        return zone
+
+    zones: List[ZoneResult] = []
+    for rw in dict.fromkeys(t.rw for t in tests):
+        with ThreadPoolExecutor(max_workers=max(concurrency, 1)) as pool:
+            zones += pool.map(run, enumerate(t for t in tests if t.rw == rw))
+    flag_zone_outliers(zones)
+    return zones
+
+
+def flag_zone_outliers(zones: List[ZoneResult]) -> List[ZoneResult]:
+    """Mark zones far below the median bandwidth or above the median p99."""
+    for rw in {z.rw for z in zones}:
+        group = [z for z in zones if z.rw == rw]
+        bw_median = statistics.median(z.bw for z in group)
+        lat_median = statistics.median(z.lat_p99 for z in group)
+        for z in group:
+            z.outlier = z.bw < bw_median * ZONE_OUTLIER_BW or (
+                lat_median > 0 and z.lat_p99 > lat_median * ZONE_OUTLIER_LAT
+            )
+    return [z for z in zones if z.outlier]
+
+
+def zone_map(zones: List[ZoneResult], rw: str) -> str:
+    """Return a one character per zone map (``.`` normal, ``x`` outlier)."""
+    return "".join("x" if z.outlier else "." for z in zones if z.rw == rw)
+
+
+# --------------------------- latency under load ----------------------------
+
+
+def build_qos_cmd(dev: str, background: str, depth: int, engine: Optional[str] = None) -> List[str]:
+    """Return one fio command running the QD1 probe next to *background*.
+
+    The probe is the first reporting group and the background jobs, with
+    *depth* outstanding I/Os split by :func:`depth_to_jobs`, the second.
+    Sequential background jobs each stream through their own slice of the
+    device, like ``run_fio`` does with ``offset_increment``.
+    """
+    rw, bs, _ = QOS_BACKGROUND[background]
+    qd, jobs = depth_to_jobs(depth)
+    extra = {"numjobs": str(jobs)}
+    if not rw.startswith("rand") and jobs > 1:
+        # give every sequential stream its own slice instead of all jobs
+        # writing the same LBAs from offset 0
+        share = f"{100 // jobs}%"
+        extra.update(offset_increment=share, size=share)
+    probe = FioTest("qos_probe", "randread", "4k", 1, engine=engine)
+    load = FioTest(f"qos_{background}", rw, bs, qd, extra=extra, engine=engine)
+    # options after --name apply to that job; --new_group splits reporting
+    return probe.build_cmd(dev) + load.build_cmd(dev)[1:] + ["--new_group"]
+
+
+@traced("run_qos_point", lambda dev, background, *args, **kwargs: {"dev": dev, "bg": background})
+def run_qos_point(
+    dev: str, background: str, depth: int, engine: Optional[str] = None, dry_run: bool = False
+) -> QosPoint:
+    """Measure probe latency while *background* runs at *depth*.
+
+    The point records the depth fio actually ran, which
+    :func:`depth_to_jobs` rounds down to a multiple of ``KNEE_QD_PER_JOB``
+    above one job.
+    """
+    qd, numjobs = depth_to_jobs(depth)
+    if dry_run:
+        return QosPoint(qd * numjobs, 0.0, 0.0, 0.0, 0.0)
+    jobs = _exec_fio(build_qos_cmd(dev, background, depth, engine)).get("jobs", [])
+    if len(jobs) < 2:
+        raise FioRuntimeError(f"expected probe and background groups, got {len(jobs)}")
+    probe, load = _job_metrics(jobs[0]), _job_metrics(jobs[1])
+    return QosPoint(
+        qd * numjobs,
+        load.get("bw", 0.0),
+        load.get("iops", 0.0),
+        probe.get("p99", 0.0),
+        probe.get("p99.9", 0.0),
+    )
+
+
+def qos_backgrounds(requested: Iterable[str], allow_write: bool) -> List[str]:
+    """Return the *requested* background workloads allowed to run."""
+    return [b for b in requested if allow_write or not QOS_BACKGROUND[b][2]]
+
+
+def qos_metric(qos: Dict[str, List[QosPoint]]) -> Optional[float]:
+    """Return the mean probe p99.9 over all QoS points (lower is better)."""
+    tails = [p.probe_p999 or p.probe_p99 for curve in qos.values() for p in curve]
+    return statistics.mean(tails) if tails else None
+
+
 # --------------------------- scoring --------------------------------------
 
 PROFILES = {
@@ -282,25 +1062,41 @@ PROFILES = {
         "rand_write_qd32": 0.1,
         "latency_read": 0.05,
         "latency_write": 0.05,
-        "stability": 0.1,
+        "stability": 0.05,
+        "efficiency": 0.05,
     },
     "iops": {
         "rand_read_qd32": 0.3,
-        "rand_write_qd32": 0.25,
-        "latency_read": 0.125,
-        "latency_write": 0.125,
-        "seq_read": 0.1,
-        "seq_write": 0.1,
-        "stability": 0.1,
+        "rand_write_qd32": 0.2,
+        "latency_read": 0.1,
+        "latency_write": 0.1,
+        "seq_read": 0.05,
+        "seq_write": 0.05,
+        "stability": 0.05,
+        "efficiency": 0.05,
+        "qos": 0.1,
     },
+    # tail latency during rebuilds and streaming matters most for parity RAID
     "parity": {
-        "rand_write_qd32": 0.25,
-        "seq_write": 0.2,
-        "latency_write": 0.2,
-        "rand_read_qd32": 0.15,
-        "latency_read": 0.1,
-        "seq_read": 0.1,
-        "stability": 0.1,
+        "rand_write_qd32": 0.2,
+        "seq_write": 0.15,
+        "latency_write": 0.15,
+        "rand_read_qd32": 0.1,
+        "latency_read": 0.05,
+        "seq_read": 0.05,
+        "stability": 0.05,
+        "efficiency": 0.05,
+        "qos": 0.2,
+    },
+    "filesystem": {
+        "fs_seq_read": 0.2,
+        "fs_seq_write": 0.2,
+        "fs_manyfiles_read": 0.15,
+        "fs_manyfiles_write": 0.1,
+        "fs_fsync_write": 0.1,
+        "fs_meta": 0.15,
+        "stability": 0.05,
+        "efficiency": 0.05,
     },
 }
 
@@ -312,21 +1108,35 @@ def normalise(metrics: Dict[str, float], higher_better: bool) -> Dict[str, float
     return {k: 1 - (v / max_val) for k, v in metrics.items()}
 
 
+def _score_metric(test_name: str, result: FioResult) -> float:
+    """Return the raw value used to score *test_name*."""
+    if test_name == "fs_meta" or "fsync" in test_name:
+        return result.iops
+    if test_name.startswith("fs_") or "seq" in test_name or "rand" in test_name:
+        return result.bw
+    return result.lat_p50
+
+
+@traced("apply_scoring")
 def apply_scoring(devices: List[DeviceReport], profile: str) -> None:
     weights = PROFILES[profile]
     # collect per-test metrics across devices
     metric_maps: Dict[str, Dict[str, float]] = {}
     for dev in devices:
         for test_name, result in dev.results.items():
-            metric_maps.setdefault(test_name, {})[dev.name] = (
-                result.bw if "seq" in test_name or "rand" in test_name else result.lat_p50
-            )
+            metric_maps.setdefault(test_name, {})[dev.name] = _score_metric(test_name, result)
         metric_maps.setdefault("stability", {})[dev.name] = (
             sum(r.bw_cov for r in dev.results.values()) / max(len(dev.results), 1)
         )
+        # IOPS per busy core: favours configurations leaving CPU headroom
+        per_core = [r.iops_per_core for r in dev.results.values() if r.iops_per_core]
+        metric_maps.setdefault("efficiency", {})[dev.name] = _mean_std(per_core)[0]
+        qos = qos_metric(dev.qos)
+        if qos is not None:
+            metric_maps.setdefault("qos", {})[dev.name] = qos
     norm_metrics: Dict[str, Dict[str, float]] = {}
     for name, values in metric_maps.items():
-        higher_better = name not in {"latency_read", "latency_write", "stability"}
+        higher_better = name not in {"latency_read", "latency_write", "stability", "qos"}
         norm_metrics[name] = normalise(values, higher_better=higher_better)
     for dev in devices:
         score = 0.0
@@ -339,31 +1149,249 @@ def apply_scoring(devices: List[DeviceReport], profile: str) -> None:
 # --------------------------- export helpers --------------------------------
 
 
+@traced("export_reports")
 def export_reports(devices: List[DeviceReport], fmt: List[str], path: str = "report") -> None:
     os.makedirs(path, exist_ok=True)
     base = os.path.join(path, "results")
     if "json" in fmt:
         with open(base + ".json", "w") as fh:
-            json.dump([dev.__dict__ for dev in devices], fh, indent=2)
+            json.dump([asdict(dev) for dev in devices], fh, indent=2)
     if "csv" in fmt:
         with open(base + ".csv", "w", newline="") as fh:
             writer = csv.writer(fh)
-            header = ["device", "score"]
+            header = ["device", "score", "knee_qd", "knee_numjobs", "slo_qd", "slo_numjobs"]
             writer.writerow(header)
             for dev in devices:
-                writer.writerow([dev.name, dev.score])
+                knee = dev.saturation.get("knee", {})
+                slo = dev.saturation.get("slo", {})
+                writer.writerow(
+                    [
+                        dev.name,
+                        dev.score,
+                        knee.get("qd", ""),
+                        knee.get("numjobs", ""),
+                        slo.get("qd", ""),
+                        slo.get("numjobs", ""),
+                    ]
+                )
+        if any(dev.engine_results for dev in devices):
+            with open(base + "_engines.csv", "w", newline="") as fh:
+                writer = csv.writer(fh)
+                writer.writerow(
+                    ["device", "engine", "selected", "iops", "lat_p50_ms", "lat_p99_ms",
+                     "cpu_us_per_io", "iops_per_core"]
+                )
+                for dev in devices:
+                    for test_name, res in sorted(dev.engine_results.items()):
+                        engine = test_name[len("engine_"):]
+                        writer.writerow(
+                            [dev.name, engine, int(engine == dev.engine), round(res.iops),
+                             round(res.lat_p50, 3), round(res.lat_p99, 3),
+                             round(res.cpu_us_per_io, 3), round(res.iops_per_core)]
+                        )
+        if any(dev.bs_curves for dev in devices):
+            with open(base + "_bs.csv", "w", newline="") as fh:
+                writer = csv.writer(fh)
+                writer.writerow(["device", "workload", "bs", "bw_mib_s"])
+                for dev in devices:
+                    for workload, curve in sorted(dev.bs_curves.items()):
+                        for bs, bw in curve.items():
+                            writer.writerow([dev.name, workload, bs, round(bw, 1)])
+        if any(dev.qos for dev in devices):
+            with open(base + "_qos.csv", "w", newline="") as fh:
+                writer = csv.writer(fh)
+                writer.writerow(
+                    ["device", "background", "depth", "bg_bw_mib_s", "bg_iops",
+                     "probe_p99_ms", "probe_p999_ms"]
+                )
+                for dev in devices:
+                    for background, curve in sorted(dev.qos.items()):
+                        for p in curve:
+                            writer.writerow(
+                                [dev.name, background, p.depth, round(p.bg_bw, 1),
+                                 round(p.bg_iops), round(p.probe_p99, 3), round(p.probe_p999, 3)]
+                            )
+        if any(dev.zones for dev in devices):
+            with open(base + "_zones.csv", "w", newline="") as fh:
+                writer = csv.writer(fh)
+                writer.writerow(
+                    ["device", "zone", "offset", "rw", "bw_mib_s", "iops", "lat_p99_ms", "outlier"]
+                )
+                for dev in devices:
+                    for z in dev.zones:
+                        writer.writerow(
+                            [dev.name, z.index, z.offset, z.rw, round(z.bw, 1), round(z.iops),
+                             round(z.lat_p99, 3), int(z.outlier)]
+                        )
     if "yaml" in fmt and yaml:
         with open(base + ".yaml", "w") as fh:
-            yaml.safe_dump([dev.__dict__ for dev in devices], fh)
+            yaml.safe_dump([asdict(dev) for dev in devices], fh)
 
 
 # --------------------------- main entry ------------------------------------
 
 
+def run_filesystem(
+    mountpoint: str,
+    allow_write: bool,
+    repeat: int,
+    dry_run: bool = False,
+    tests: Optional[List[FioTest]] = None,
+    meta_files: int = DEFAULT_META_FILES,
+    metrics: Optional[BenchmarkMetrics] = None,
+    stream_size: str = DEFAULT_FS_STREAM,
+    nfiles: int = DEFAULT_FS_FILES,
+) -> DeviceReport:
+    """Run the filesystem test matrix against *mountpoint*.
+
+    Files are created in a scratch directory below the mountpoint which is
+    removed once all tests have finished; even read-only runs need fio to
+    lay out their test files.  *tests* defaults to
+    :func:`build_fs_test_matrix` with *stream_size* and *nfiles* capped by
+    :func:`fs_layout`.
+    """
+    report = DeviceReport(name=mountpoint)
+    if not dry_run and not os.path.ismount(mountpoint):
+        report.reasons.append("not a mountpoint")
+        return report
+    workdir = os.path.join(mountpoint, FS_WORKDIR)
+    if tests is None:
+        try:
+            stream, files = fs_layout(mountpoint, stream_size, nfiles)
+        except OSError:  # dry run against a path that does not exist
+            stream, files = parse_bytes(stream_size), nfiles
+        layout = (stream + files * FS_FILE_SIZE) / 2**30
+        print(
+            f"{mountpoint}: fio lays out {layout:.1f} GiB of test files "
+            f"({files} small files) in {workdir}, removed afterwards"
+        )
+        tests = build_fs_test_matrix(
+            allow_write, _fs_type(mountpoint) != "tmpfs", str(stream), files
+        )
+    progress = _DeviceProgress(mountpoint, len(tests) + (1 if allow_write else 0), metrics)
+    try:
+        if not dry_run:
+            os.makedirs(workdir, exist_ok=True)
+        for test in tests:
+            progress.start(test.name)
+            try:
+                result = run_test(workdir, test, repeat, dry_run, metrics, label=mountpoint)
+            except FioRuntimeError as exc:
+                report.reasons.append(f"fio error: {exc}")
+                report.results.clear()
+                return report
+            finally:
+                progress.finish(test.name)
+            report.results[test.name] = result
+        if allow_write:
+            progress.start("fs_meta")
+            report.results["fs_meta"] = run_metadata_test(
+                mountpoint, nfiles=meta_files, repeat=repeat, dry_run=dry_run
+            )
+            progress.finish("fs_meta")
+    finally:
+        if not dry_run:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return report
+
+
+def _fs_type(mountpoint: str) -> str:
+    """Return filesystem type of *mountpoint* from ``/proc/mounts``."""
+    path = os.path.realpath(mountpoint)
+    fstype = ""
+    try:
+        with open("/proc/mounts") as fh:
+            for line in fh:
+                parts = line.split()
+                # later entries shadow earlier mounts on the same path
+                if len(parts) > 2 and parts[1] == path:
+                    fstype = parts[2]
+    except OSError:
+        pass
+    return fstype
+
+
+@dataclass
+class _DeviceProgress:
+    """Per-device run counter published through :class:`BenchmarkMetrics`.
+
+    With *smart* set the SMART log is re-read after every run so the
+    temperature gauge follows the device during long benchmarks.
+    """
+
+    dev: str
+    total: int
+    metrics: Optional[BenchmarkMetrics] = None
+    smart: bool = False
+    done: int = 0
+
+    def start(self, test: str) -> None:
+        if self.metrics is not None:
+            self.metrics.progress(self.dev, test, self.done, self.total, running=True)
+
+    def finish(self, test: str, runs: int = 1) -> None:
+        self.done += runs
+        if self.metrics is None:
+            return
+        self.metrics.progress(self.dev, test, self.done, self.total, running=False)
+        if self.smart:
+            self.metrics.smart(self.dev, collect_smart(self.dev))
+
+
+def _run_tracked(test: FioTest, args: argparse.Namespace, progress: _DeviceProgress) -> FioResult:
+    """Run *test* on ``progress.dev`` publishing progress and samples."""
+    progress.start(test.name)
+    try:
+        return run_test(progress.dev, test, args.repeat, args.dry_run, progress.metrics)
+    finally:
+        progress.finish(test.name)
+
+
 def run_complex(args: argparse.Namespace) -> int:
+    if args.profile is None:
+        # raw namespace profiles weight no fs_* results
+        args.profile = "filesystem" if args.fs_mount else "throughput"
+    metrics: Optional[BenchmarkMetrics] = None
+    if args.metrics_textfile or args.metrics_port is not None:
+        from fio_metrics import BenchmarkMetrics
+
+        metrics = BenchmarkMetrics(args.metrics_textfile, args.metrics_port)
+    try:
+        return _run_complex(args, metrics)
+    finally:
+        if metrics is not None:
+            metrics.close()
+
+
+def _run_complex(args: argparse.Namespace, metrics: Optional[BenchmarkMetrics]) -> int:
     from nvme_fio import discover_nvme_namespaces, select_namespaces
 
-    devs = discover_nvme_namespaces()
+    reports: List[DeviceReport] = []
+    if args.fs_mount:
+        for mnt in args.fs_mount:
+            reports.append(
+                run_filesystem(
+                    mnt,
+                    args.allow_write,
+                    args.repeat,
+                    args.dry_run,
+                    metrics=metrics,
+                    stream_size=args.fs_size,
+                    nfiles=args.fs_files,
+                )
+            )
+        return _finish(reports, args)
+
+    if args.replay:
+        # fail before hours of tests rather than at the end of each device
+        try:
+            with open_trace(args.replay):
+                pass
+        except OSError as exc:
+            print(f"Cannot read replay trace: {exc}")
+            return 1
+    with TRACER.span("discover_nvme_namespaces"):
+        devs = discover_nvme_namespaces()
     if not devs:
         print("No unused NVMe namespaces found")
         return 1
@@ -371,27 +1399,225 @@ def run_complex(args: argparse.Namespace) -> int:
     if not selected:
         return 1
     qd_sweep = args.qd or DEFAULT_QD
-    tests = build_test_matrix(args.allow_write, qd_sweep)
-    reports: List[DeviceReport] = []
+    block_sizes = (args.bs or DEFAULT_BS) if args.bs is not None else None
+    bssplits = dict(NFS_BSSPLIT) if args.bs is not None else {}
+    for i, spec in enumerate(args.bssplit or []):
+        bssplits[f"custom{i}"] = spec
+    if args.bssplit_from:
+        bssplits["recorded"] = bssplit_from_trace(args.bssplit_from)
+        print(f"Recorded size distribution: {bssplits['recorded']}")
+    tests = build_test_matrix(args.allow_write, qd_sweep, block_sizes, bssplits)
+    engine_tests: List[FioTest] = []
+    if args.engines is not None:
+        engine_tests = build_engine_matrix(args.engines or ENGINES)
+    total = _planned_runs(args, len(engine_tests) + len(tests))
     for dev in selected:
-        report = DeviceReport(name=dev)
+        report = DeviceReport(name=dev, numa_node=numa_node(dev))
         if not args.no_smart:
             report.smart = collect_smart(dev)
             smart_prefilter(report)
-        for test in tests:
+            if metrics is not None:
+                metrics.smart(dev, report.smart)
+        progress = _DeviceProgress(dev, total, metrics, smart=not args.no_smart)
+        for test in engine_tests:
+            try:
+                report.engine_results[test.name] = _run_tracked(test, args, progress)
+            except FioRuntimeError as exc:
+                # e.g. hipri without poll queues; skip the engine
+                print(f"{dev}: {test.engine} unsupported: {exc}")
+        report.engine = select_engine(report.engine_results) or DEFAULT_ENGINE
+        dev_tests = tests
+        if args.knee:
+            report.saturation = _run_knee_search(dev, report, args, progress)
+            dev_tests = apply_knee(tests, report.saturation)
+        for test in (replace(t, engine=t.engine or report.engine) for t in dev_tests):
             try:
-                result = run_test(dev, test, args.repeat, args.dry_run)
+                result = _run_tracked(test, args, progress)
             except FioRuntimeError as exc:
                 report.reasons.append(f"fio error: {exc}")
                 report.results.clear()
                 break
             report.results[test.name] = result
+        if args.replay and report.results:
+            _run_replay(dev, report, args, progress)
+        report.bs_curves = bs_curves(report.results)
+        if args.qos is not None and report.results:
+            _run_qos(dev, report, args, progress)
+        if args.zone_scan and report.results:
+            _run_zone_scan(dev, report, args, progress)
         reports.append(report)
+    return _finish(reports, args)
+
+
+# distinct depths find_saturation can measure
+_KNEE_MAX_RUNS = int(math.log2(KNEE_MAX_DEPTH)) + 1
+
+
+def _zone_runs(args: argparse.Namespace) -> int:
+    return args.zone_scan * (2 if args.zone_write and args.allow_write else 1)
+
+
+def _planned_runs(args: argparse.Namespace, tests: int) -> int:
+    """Return the number of runs per device reported as ``tests_total``.
+
+    The knee search is counted at its upper bound and corrected once it has
+    finished (see :func:`_run_knee_search`).
+    """
+    runs = tests + (1 if args.replay else 0)
+    if args.knee:
+        runs += _KNEE_MAX_RUNS
+    if args.qos is not None:
+        backgrounds = qos_backgrounds(args.qos or QOS_BACKGROUND, args.allow_write)
+        runs += len(backgrounds) * len(args.qos_depths or QOS_DEPTHS)
+    if args.zone_scan:
+        runs += _zone_runs(args)
+    return runs
+
+
+def _run_knee_search(
+    dev: str,
+    report: DeviceReport,
+    args: argparse.Namespace,
+    progress: _DeviceProgress,
+) -> Dict[str, Any]:
+    """Run :func:`find_saturation` on *dev* and print the operating points."""
+
+    def measure(qd: int, numjobs: int) -> FioResult:
+        return _run_tracked(
+            replace(build_knee_test(qd, numjobs), engine=report.engine), args, progress
+        )
+
+    start = progress.done
+    try:
+        saturation = find_saturation(measure, args.latency_slo)
+    except FioRuntimeError as exc:
+        report.reasons.append(f"knee search error: {exc}")
+        return {}
+    finally:
+        # give back the budgeted runs the search did not need
+        progress.total -= _KNEE_MAX_RUNS - (progress.done - start)
+    knee, slo = saturation["knee"], saturation.get("slo")
+    print(
+        f"{dev}: knee at qd={knee['qd']} numjobs={knee['numjobs']} "
+        f"({knee['iops']:.0f} IOPS) after {saturation['runs']} runs"
+    )
+    if slo:
+        print(
+            f"{dev}: max under p99<={args.latency_slo}ms at qd={slo['qd']} "
+            f"numjobs={slo['numjobs']} ({slo['iops']:.0f} IOPS)"
+        )
+    return saturation
+
+
+def _run_qos(
+    dev: str, report: DeviceReport, args: argparse.Namespace, progress: _DeviceProgress
+) -> None:
+    """Record probe latency curves for the requested background workloads."""
+    for background in qos_backgrounds(args.qos or QOS_BACKGROUND, args.allow_write):
+        curve: List[QosPoint] = []
+        try:
+            for depth in args.qos_depths or QOS_DEPTHS:
+                name = f"qos_{background}_d{depth}"
+                progress.start(name)
+                try:
+                    point = run_qos_point(dev, background, depth, report.engine, args.dry_run)
+                finally:
+                    progress.finish(name)
+                curve.append(point)
+        except FioRuntimeError as exc:
+            report.reasons.append(f"qos error: {exc}")
+            return
+        report.qos[background] = curve
+
+
+def _run_zone_scan(
+    dev: str, report: DeviceReport, args: argparse.Namespace, progress: _DeviceProgress
+) -> None:
+    """Scan *dev* in ``args.zone_scan`` zones and flag slow regions."""
+    try:
+        capacity = device_capacity(dev)
+    except (OSError, ValueError) as exc:
+        print(f"{dev}: zone scan skipped, unknown capacity: {exc}")
+        progress.total -= _zone_runs(args)
+        return
+    tests = build_zone_tests(capacity, args.zone_scan)
+    if args.zone_write and args.allow_write:
+        tests += build_zone_tests(capacity, args.zone_scan, rw="write")
+    tests = [replace(t, engine=report.engine) for t in tests]
+    progress.total += len(tests) - _zone_runs(args)
+    progress.start("zone_scan")
+    try:
+        report.zones = scan_zones(dev, tests, args.zone_jobs, args.dry_run)
+    except FioRuntimeError as exc:
+        report.reasons.append(f"zone scan error: {exc}")
+        return
+    finally:
+        progress.finish("zone_scan", len(tests))
+    slow = [z for z in report.zones if z.outlier]
+    if slow:
+        report.reasons.append(f"{len(slow)} slow LBA zones")
+
+
+def _run_replay(
+    dev: str,
+    report: DeviceReport,
+    args: argparse.Namespace,
+    progress: _DeviceProgress,
+) -> None:
+    """Replay ``args.replay`` on *dev* and record the achieved fidelity."""
+    try:
+        test, stats = build_replay_test(
+            args.replay, dev, args.allow_write, args.replay_time_scale
+        )
+    except OSError as exc:
+        report.reasons.append(f"replay error: {exc}")
+        progress.total -= 1
+        return
+    test = replace(test, engine=report.engine)
+    try:
+        result = _run_tracked(test, args, progress)
+    except FioRuntimeError as exc:
+        report.reasons.append(f"replay error: {exc}")
+        return
+    finally:
+        # iologs of multi-GB traces are as large as the trace itself
+        os.unlink(test.extra["read_iolog"])
+    recorded = stats.rate(args.replay_time_scale)
+    result.replay_fidelity = result.iops / recorded if recorded else 0.0
+    report.results[test.name] = result
+    print(
+        f"{dev}: replayed {stats.ios} I/Os at {result.iops:.0f} IOPS "
+        f"(recorded {recorded:.0f}, fidelity {result.replay_fidelity:.2f})"
+    )
+
+
+def _finish(reports: List[DeviceReport], args: argparse.Namespace) -> int:
+    """Score, print and export *reports*."""
     apply_scoring(reports, args.profile)
     reports.sort(key=lambda r: r.score, reverse=True)
     print("Complex test results:")
     for rep in reports:
-        print(f"{rep.name}: score={rep.score:.3f} reasons={','.join(rep.reasons) or 'OK'}")
+        print(
+            f"{rep.name}: score={rep.score:.3f} engine={rep.engine} "
+            f"reasons={','.join(rep.reasons) or 'OK'}"
+        )
+    for rep in reports:
+        for test_name, res in sorted(rep.engine_results.items()):
+            print(
+                f"  {rep.name} {test_name[len('engine_'):]}: {res.iops:.0f} IOPS "
+                f"p50={res.lat_p50:.3f}ms p99={res.lat_p99:.3f}ms "
+                f"cpu={res.cpu_us_per_io:.2f}us/IO"
+            )
+        for workload, curve in sorted(rep.bs_curves.items()):
+            points = " ".join(f"{bs}={bw:.0f}" for bs, bw in curve.items())
+            print(f"  {rep.name} {workload} MiB/s: {points}")
+        for background, curve in sorted(rep.qos.items()):
+            points = " ".join(
+                f"{p.bg_bw:.0f}MiB/s:{p.probe_p99:.3f}/{p.probe_p999:.3f}" for p in curve
+            )
+            print(f"  {rep.name} qos {background} (bg, probe p99/p99.9 ms): {points}")
+        for rw in sorted({z.rw for z in rep.zones}):
+            print(f"  {rep.name} zones {rw}: [{zone_map(rep.zones, rw)}]")
     if args.top:
         print("Top devices:")
         for rep in reports[: args.top]:
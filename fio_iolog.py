@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""Convert captured block traces into fio ``read_iolog`` files.
+
+Two capture sources are supported:
+
+* ``blkparse`` text output (``blktrace -d /dev/xi_data -o - | blkparse -i -``)
+* periodic sampling of ``/sys/block/<dev>/stat``; only rates and mean
+  request sizes are known, so offsets are drawn uniformly at random
+
+Events are written in fio's version 3 iolog format, which keeps a
+millisecond timestamp per I/O so fio replays the recorded timing.  Timing can
+be compressed or stretched with a time scale and offsets remapped onto the
+namespace under test.  Everything is processed as a stream: traces are read
+line by line (gzip is supported) and never loaded into memory as a whole.
+
+Example::
+
+    blkparse -i trace | ./fio_iolog.py convert - nfs.iolog --target-size 3.2T
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import gzip
+import io
+import random
+import sys
+import time
+from dataclasses import dataclass
+from typing import IO, ContextManager, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+IOLOG_HEADER = "fio version 3 iolog"
+SECTOR = 512
+# blkparse RWBS flags mapped to fio iolog actions
+_ACTIONS = (("D", "trim"), ("W", "write"), ("R", "read"))
+
+
+class TraceEvent(NamedTuple):
+    time: float  # seconds since capture start
+    action: str  # read / write / trim
+    offset: int  # bytes
+    length: int  # bytes
+
+
+@dataclass
+class IologStats:
+    """Summary of the events written to an iolog."""
+
+    ios: int = 0
+    bytes: int = 0
+    duration: float = 0.0  # recorded seconds, before time scaling
+
+    def rate(self, time_scale: float = 1.0) -> float:
+        """Return the IOPS fio should reach when replaying at *time_scale*."""
+        span = self.duration / time_scale
+        return self.ios / span if span > 0 else 0.0
+
+
+# --------------------------- parsing ---------------------------------------
+
+
+def open_trace(path: str) -> ContextManager[IO[str]]:
+    """Open *path* (``-`` for stdin, ``.gz`` transparently) for streaming."""
+    if path == "-":
+        return contextlib.nullcontext(sys.stdin)
+    if path.endswith(".gz"):
+        return io.TextIOWrapper(gzip.open(path, "rb"))
+    return open(path)
+
+
+def parse_blkparse(lines: Iterable[str], phase: str = "Q") -> Iterator[TraceEvent]:
+    """Yield events from ``blkparse`` default output lines.
+
+    Only events of the given *phase* are used (``Q`` = queued by the
+    application, ``D`` = issued to the driver); summary lines are skipped.
+    """
+    for line in lines:
+        # dev cpu seq time pid action rwbs sector + nblocks [process]
+        f = line.split()
+        if len(f) < 10 or f[5] != phase or f[8] != "+":
+            continue
+        action = next((name for flag, name in _ACTIONS if flag in f[6]), None)
+        if action is None:
+            continue
+        try:
+            t, sector, blocks = float(f[3]), int(f[7]), int(f[9])
+        except ValueError:
+            continue
+        if blocks:
+            yield TraceEvent(t, action, sector * SECTOR, blocks * SECTOR)
+
+
+def events_from_stat_samples(
+    samples: Iterable[Tuple[float, List[int]]],
+    capacity: int,
+    align: int = 4096,
+    seed: int = 0,
+) -> Iterator[TraceEvent]:
+    """Synthesize events from successive ``/sys/block/<dev>/stat`` samples.
+
+    Each interval's completed reads/writes are spread evenly over the
+    interval with the interval's mean request size and random offsets.
+    """
+    rng = random.Random(seed)
+    slots = max(capacity // align, 1)
+    prev: Optional[Tuple[float, List[int]]] = None
+    start = None
+    for t, stat in samples:
+        if prev is None:
+            prev, start = (t, stat), t
+            continue
+        (t0, s0), dt = prev, t - prev[0]
+        # stat fields: read ios/merges/sectors/ticks, write ios/merges/sectors
+        batch = []
+        for action, ios_idx, sec_idx in (("read", 0, 2), ("write", 4, 6)):
+            ios = stat[ios_idx] - s0[ios_idx]
+            if ios <= 0:
+                continue
+            size = (stat[sec_idx] - s0[sec_idx]) * SECTOR // ios
+            size = max(align, size // align * align)
+            for i in range(ios):
+                batch.append((t0 - start + dt * i / ios, action, size))
+        for ts, action, size in sorted(batch):
+            offset = min(rng.randrange(slots) * align, max(capacity - size, 0))
+            yield TraceEvent(ts, action, offset, size)
+        prev = (t, stat)
+
+
+def sample_sysfs(dev: str, interval: float, duration: float) -> Iterator[Tuple[float, List[int]]]:
+    """Yield ``(time, stat fields)`` for *dev* every *interval* seconds."""
+    name = dev.rsplit("/", 1)[-1]
+    end = time.monotonic() + duration
+    while True:
+        now = time.monotonic()
+        with open(f"/sys/block/{name}/stat") as fh:
+            yield now, [int(v) for v in fh.read().split()]
+        if now >= end:
+            return
+        time.sleep(min(interval, max(end - now, 0)))
+
+
+def device_capacity(dev: str) -> int:
+    """Return size of block device *dev* in bytes using sysfs."""
+    name = dev.rsplit("/", 1)[-1]
+    with open(f"/sys/class/block/{name}/size") as fh:
+        return int(fh.read()) * SECTOR
+
+
+# --------------------------- conversion ------------------------------------
+
+
+@dataclass
+class Remapper:
+    """Map recorded offsets onto a target range.
+
+    With *source_size* known offsets are scaled proportionally so locality is
+    preserved; otherwise they wrap modulo *target_size*.
+    """
+
+    target_size: int
+    source_size: Optional[int] = None
+    target_offset: int = 0
+    align: int = 4096
+
+    def __call__(self, offset: int, length: int) -> int:
+        if self.source_size:
+            offset = offset * self.target_size // self.source_size
+        else:
+            offset %= self.target_size
+        offset = offset // self.align * self.align
+        offset = min(offset, max(self.target_size - length, 0))
+        return self.target_offset + offset
+
+
+def write_iolog(
+    events: Iterable[TraceEvent],
+    out: IO[str],
+    filename: str,
+    time_scale: float = 1.0,
+    remap: Optional[Remapper] = None,
+    reads_only: bool = False,
+) -> IologStats:
+    """Write *events* to *out* as a v3 iolog for *filename*.
+
+    *time_scale* > 1 replays faster than recorded.  With *reads_only* write
+    and trim events are dropped so replays are non-destructive.
+    """
+    stats = IologStats()
+    out.write(f"{IOLOG_HEADER}\n0 {filename} add\n0 {filename} open\n")
+    first: Optional[float] = None
+    last_ms = 0
+    for ev in events:
+        if reads_only and ev.action != "read":
+            continue
+        if first is None:
+            first = ev.time
+        offset = remap(ev.offset, ev.length) if remap else ev.offset
+        last_ms = int((ev.time - first) / time_scale * 1000)
+        out.write(f"{last_ms} {filename} {ev.action} {offset} {ev.length}\n")
+        stats.ios += 1
+        stats.bytes += ev.length
+        stats.duration = ev.time - first
+    out.write(f"{last_ms} {filename} close\n")
+    return stats
+
+
+def convert_trace(
+    trace: str,
+    iolog: str,
+    filename: str,
+    target_size: Optional[int] = None,
+    source_size: Optional[int] = None,
+    time_scale: float = 1.0,
+    reads_only: bool = False,
+    phase: str = "Q",
+) -> IologStats:
+    """Stream blkparse *trace* into *iolog* for replay against *filename*."""
+    remap = Remapper(target_size, source_size) if target_size else None
+    with open_trace(trace) as src, open(iolog, "w") as dst:
+        return write_iolog(
+            parse_blkparse(src, phase), dst, filename, time_scale, remap, reads_only
+        )
+
+
+# --------------------------- main entry ------------------------------------
+
+
+def parse_bytes(value: str) -> int:
+    """Parse a size such as ``3.2T``, ``16g`` or ``512KiB`` into bytes."""
+    units = {"K": 1, "M": 2, "G": 3, "T": 4, "P": 5}
+    value = value.strip().upper().rstrip("B").rstrip("I")
+    if value and value[-1] in units:
+        return int(float(value[:-1]) * 1024 ** units[value[-1]])
+    return int(value)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Build fio iologs from block traces")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    conv = sub.add_parser("convert", help="Convert blkparse output ('-' for stdin)")
+    conv.add_argument("trace")
+    conv.add_argument("iolog")
+    conv.add_argument("--phase", choices=["Q", "D"], default="Q")
+    samp = sub.add_parser("sample", help="Sample /sys/block/<dev>/stat into an iolog")
+    samp.add_argument("device")
+    samp.add_argument("iolog")
+    samp.add_argument("--interval", type=float, default=1.0)
+    samp.add_argument("--duration", type=float, default=60.0)
+    for p in (conv, samp):
+        p.add_argument("--filename", default="/dev/nvme0n1", help="Target in the iolog")
+        p.add_argument("--target-size", type=parse_bytes, help="Remap onto this many bytes")
+        p.add_argument("--time-scale", type=float, default=1.0)
+        p.add_argument("--reads-only", action="store_true")
+    conv.add_argument("--source-size", type=parse_bytes, help="Size of the traced device")
+    args = parser.parse_args(argv)
+
+    if args.cmd == "convert":
+        stats = convert_trace(
+            args.trace,
+            args.iolog,
+            args.filename,
+            args.target_size,
+            args.source_size,
+            args.time_scale,
+            args.reads_only,
+            args.phase,
+        )
+    else:
+        capacity = device_capacity(args.device)
+        events = events_from_stat_samples(
+            sample_sysfs(args.device, args.interval, args.duration), capacity
+        )
+        remap = Remapper(args.target_size, capacity) if args.target_size else None
+        with open(args.iolog, "w") as dst:
+            stats = write_iolog(
+                events, dst, args.filename, args.time_scale, remap, args.reads_only
+            )
+    print(
+        f"{stats.ios} I/Os, {stats.bytes / 2**20:.1f} MiB over {stats.duration:.1f}s "
+        f"({stats.rate(args.time_scale):.0f} IOPS at replay)"
+    )
+    return 0
+
+
+if __name__ == "__main__":  # pragma: no cover - entrypoint
+    sys.exit(main())
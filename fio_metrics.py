@@ -0,0 +1,232 @@
+# coding: utf-8
+"""Prometheus exposition of live benchmark metrics for ``complex_fio``.
+
+Benchmark runs publish per-device/per-test gauges and histograms so they can
+be watched next to the ``xiraid_exporter`` metrics.  Two outputs are
+supported:
+
+* a node_exporter textfile-collector file, atomically rewritten after every
+  update (``--metrics-textfile``)
+* a small built-in HTTP endpoint serving ``/metrics`` (``--metrics-port``)
+
+Metrics are updated after every fio run (i.e. each repeat of each test), so
+with the default 60s runtime dashboards lag the benchmark by at most one run.
+"""
+from __future__ import annotations
+
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+PREFIX = "xitools_fio"
+# xiraid_exporter listens on 9505
+DEFAULT_PORT = 9506
+LATENCY_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.05, 0.1)
+DURATION_BUCKETS = (5, 15, 30, 60, 120, 300, 600)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _fmt_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    items = list(labels) + ([extra] if extra else [])
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in items) + "}"
+
+
+def _fmt_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+class _Histogram:
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.count += 1
+        self.total += value
+
+
+class MetricsRegistry:
+    """Thread-safe store of gauges and histograms rendered as text format."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._help: Dict[str, Tuple[str, str]] = {}
+        self._gauges: Dict[str, Dict[Labels, float]] = {}
+        self._hists: Dict[str, Dict[Labels, _Histogram]] = {}
+
+    def set_gauge(self, name: str, value: float, help: str, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._help.setdefault(name, ("gauge", help))
+            self._gauges.setdefault(name, {})[key] = value
+
+    def observe(
+        self, name: str, value: float, help: str, buckets: Sequence[float], **labels: str
+    ) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._help.setdefault(name, ("histogram", help))
+            series = self._hists.setdefault(name, {})
+            series.setdefault(key, _Histogram(buckets)).observe(value)
+
+    def render(self) -> str:
+        """Return all metrics in Prometheus text exposition format."""
+        lines: List[str] = []
+        with self._lock:
+            for name in sorted(self._help):
+                kind, help = self._help[name]
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in sorted(self._gauges.get(name, {}).items()):
+                    lines.append(f"{name}{_fmt_labels(labels)} {_fmt_value(value)}")
+                for labels, hist in sorted(self._hists.get(name, {}).items()):
+                    for bound, count in zip(hist.buckets, hist.counts):
+                        le = _fmt_labels(labels, ("le", _fmt_value(bound)))
+                        lines.append(f"{name}_bucket{le} {count}")
+                    le = _fmt_labels(labels, ("le", "+Inf"))
+                    lines.append(f"{name}_bucket{le} {hist.count}")
+                    lines.append(f"{name}_sum{_fmt_labels(labels)} {_fmt_value(hist.total)}")
+                    lines.append(f"{name}_count{_fmt_labels(labels)} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+
+# --------------------------- outputs ---------------------------------------
+
+
+def write_textfile(registry: MetricsRegistry, path: str) -> None:
+    """Atomically rewrite *path* for the node_exporter textfile collector."""
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as fh:
+        fh.write(registry.render())
+    os.replace(tmp, path)
+
+
+def start_http_server(
+    registry: MetricsRegistry, port: int = DEFAULT_PORT, addr: str = ""
+) -> ThreadingHTTPServer:
+    """Serve ``/metrics`` from *registry* in a daemon thread.
+
+    Pass ``port=0`` to bind an ephemeral port (see ``server_address``).
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:  # noqa: N802 - http.server API
+            if self.path.split("?", 1)[0] not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+            body = registry.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args: object) -> None:
+            pass
+
+    server = ThreadingHTTPServer((addr, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# --------------------------- benchmark facade ------------------------------
+
+
+class BenchmarkMetrics:
+    """Benchmark level metric updates used by ``complex_fio``.
+
+    Every update is followed by a flush to the textfile, if configured.
+    """
+
+    def __init__(
+        self, textfile: Optional[str] = None, port: Optional[int] = None
+    ) -> None:
+        self.registry = MetricsRegistry()
+        self.textfile = textfile
+        self.server = start_http_server(self.registry, port) if port is not None else None
+        self._flush: Callable[[], None] = (
+            (lambda: write_textfile(self.registry, textfile)) if textfile else (lambda: None)
+        )
+
+    def close(self) -> None:
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+
+    def progress(self, dev: str, test: str, done: int, total: int, running: bool) -> None:
+        """Record that *done* of *total* tests finished and whether *test* runs."""
+        r = self.registry
+        r.set_gauge(f"{PREFIX}_tests_completed", done, "Tests completed on device", device=dev)
+        r.set_gauge(f"{PREFIX}_tests_total", total, "Tests scheduled on device", device=dev)
+        r.set_gauge(
+            f"{PREFIX}_test_running",
+            1 if running else 0,
+            "Currently running test (1) on device",
+            device=dev,
+            test=test,
+        )
+        self._flush()
+
+    def sample(self, dev: str, test: str, sample: Dict[str, float], duration: float) -> None:
+        """Publish a single fio run result as returned by ``_run_fio_once``."""
+        r = self.registry
+        labels = {"device": dev, "test": test}
+        r.set_gauge(
+            f"{PREFIX}_bandwidth_bytes",
+            sample.get("bw", 0.0) * 1024 * 1024,
+            "Bandwidth of the last fio run in bytes/s",
+            **labels,
+        )
+        r.set_gauge(
+            f"{PREFIX}_iops", sample.get("iops", 0.0), "IOPS of the last fio run", **labels
+        )
+        for key, quantile in (("p50", "0.5"), ("p90", "0.9"), ("p99", "0.99"), ("p99.9", "0.999")):
+            if key in sample:
+                r.set_gauge(
+                    f"{PREFIX}_latency_seconds",
+                    sample[key] / 1000.0,
+                    "Completion latency percentile of the last fio run",
+                    quantile=quantile,
+                    **labels,
+                )
+        if "p99" in sample:
+            r.observe(
+                f"{PREFIX}_run_latency_p99_seconds",
+                sample["p99"] / 1000.0,
+                "Distribution of per-run p99 completion latency",
+                LATENCY_BUCKETS,
+                **labels,
+            )
+        r.observe(
+            f"{PREFIX}_run_duration_seconds",
+            duration,
+            "Wall clock duration of fio runs",
+            DURATION_BUCKETS,
+            **labels,
+        )
+        self._flush()
+
+    def smart(self, dev: str, data: Dict[str, int]) -> None:
+        if "temperature" in data:
+            self.registry.set_gauge(
+                f"{PREFIX}_smart_temperature_celsius",
+                data["temperature"],
+                "NVMe composite temperature from smart-log",
+                device=dev,
+            )
+            self._flush()
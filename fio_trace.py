@@ -0,0 +1,158 @@
+# coding: utf-8
+"""Phase level tracing for the ``complex_fio`` benchmark harness.
+
+Spans are recorded around discovery, SMART collection, fio process
+execution, JSON parsing, scoring and export.  They can be written as a
+Chrome trace-event JSON file (open in ``chrome://tracing`` or Perfetto) or
+printed as a summary table.
+
+Tracing is disabled by default; :meth:`Tracer.span` then returns a shared
+no-op context manager so instrumented code pays only a method call.
+"""
+from __future__ import annotations
+
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, TypeVar
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+@dataclass
+class Span:
+    """A completed timed phase."""
+
+    name: str
+    start: float  # seconds, time.perf_counter()
+    duration: float
+    tid: int
+    args: Dict[str, Any] = field(default_factory=dict)
+
+
+class _NullSpan:
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        return None
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Tracer:
+    """Collects :class:`Span` records while enabled."""
+
+    def __init__(self, enabled: bool = False) -> None:
+        self.enabled = enabled
+        self.spans: List[Span] = []
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def enable(self) -> None:
+        self.enabled = True
+        self._origin = time.perf_counter()
+
+    def clear(self) -> None:
+        with self._lock:
+            self.spans.clear()
+
+    def span(self, name: str, **args: Any):
+        """Context manager timing the enclosed block as *name*."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return self._span(name, args)
+
+    @contextmanager
+    def _span(self, name: str, args: Dict[str, Any]) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            span = Span(name, start, time.perf_counter() - start, threading.get_ident(), args)
+            with self._lock:
+                self.spans.append(span)
+
+    def record(self, name: str, start: float, duration: float, **args: Any) -> None:
+        """Add a span measured elsewhere (e.g. phases reported by fio)."""
+        if self.enabled:
+            span = Span(name, start, duration, threading.get_ident(), args)
+            with self._lock:
+                self.spans.append(span)
+
+    # ------------------------------------------------------------------ output
+
+    def chrome_trace(self) -> Dict[str, Any]:
+        """Return spans as a Chrome trace-event document."""
+        pid = os.getpid()
+        events = [
+            {
+                "name": s.name,
+                "cat": s.name.split(".", 1)[0],
+                "ph": "X",
+                "ts": round((s.start - self._origin) * 1e6, 3),
+                "dur": round(s.duration * 1e6, 3),
+                "pid": pid,
+                "tid": s.tid,
+                "args": {k: str(v) for k, v in s.args.items()},
+            }
+            for s in self.spans
+        ]
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write_chrome_trace(self, path: str) -> None:
+        with open(path, "w") as fh:
+            json.dump(self.chrome_trace(), fh)
+
+    def summary(self) -> List[Tuple[str, int, float, float, float]]:
+        """Return ``(name, count, total, mean, max)`` rows, largest total first."""
+        groups: Dict[str, List[float]] = {}
+        for s in self.spans:
+            groups.setdefault(s.name, []).append(s.duration)
+        rows = [
+            (name, len(d), sum(d), sum(d) / len(d), max(d)) for name, d in groups.items()
+        ]
+        return sorted(rows, key=lambda r: r[2], reverse=True)
+
+    def format_summary(self) -> str:
+        header = "{:<24} {:>7} {:>12} {:>12} {:>12}".format(
+            "Phase", "Count", "Total (s)", "Mean (s)", "Max (s)"
+        )
+        lines = [header, "-" * len(header)]
+        for name, count, total, mean, longest in self.summary():
+            lines.append(
+                "{:<24} {:>7} {:>12.3f} {:>12.3f} {:>12.3f}".format(
+                    name, count, total, mean, longest
+                )
+            )
+        return "\n".join(lines)
+
+
+# process wide tracer used by complex_fio
+TRACER = Tracer()
+
+
+def traced(name: str, describe: Optional[Callable[..., Dict[str, Any]]] = None) -> Callable[[F], F]:
+    """Decorator recording each call of the function as span *name*.
+
+    *describe* receives the call arguments and returns span arguments such
+    as the device name.  When tracing is disabled the wrapped function is
+    called directly.
+    """
+
+    def decorator(func: F) -> F:
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if not TRACER.enabled:
+                return func(*args, **kwargs)
+            with TRACER.span(name, **(describe(*args, **kwargs) if describe else {})):
+                return func(*args, **kwargs)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
@@ -6,7 +6,7 @@ Utility to run fio benchmarks on unused NVMe namespaces.
 - allows the user to interactively choose which of those namespaces to test
 - runs sequential read and write tests with fio
     * 128k block size
-    * libaio ioengine
+    * libaio ioengine (``--ioengine`` selects another one)
     * direct I/O
     * iodepth 32, numjobs 4
     * offset increment 10%
@@ -106,7 +106,7 @@ def discover_nvme_namespaces() -> List[str]:
 
 
 def run_fio(
-    dev: str, mode: str, debug: bool = False
+    dev: str, mode: str, debug: bool = False, ioengine: str = "libaio"
 ) -> Tuple[Optional[float], Optional[float]]:
     """Run fio for given device and mode (read/write).
 
@@ -119,7 +119,7 @@ def run_fio(
         dev,
         "--rw",
         mode,
-        "--ioengine=libaio",
+        f"--ioengine={ioengine}",
         "--direct=1",
         "--bs=128k",
         "--iodepth=32",
@@ -149,6 +149,14 @@ def run_fio(
         return None, None
 
 
+def _positive_float(value: str) -> float:
+    """argparse type accepting only numbers greater than zero."""
+    number = float(value)
+    if number <= 0:
+        raise argparse.ArgumentTypeError(f"must be greater than 0: {value}")
+    return number
+
+
 def main() -> int:
     parser = argparse.ArgumentParser(description="Run fio benchmarks on NVMe devices")
     parser.add_argument(
@@ -173,9 +181,12 @@ def main() -> int:
     )
     parser.add_argument(
         "--profile",
-        choices=["throughput", "iops", "parity"],
-        default="throughput",
-        help="Scoring profile to use in complex mode",
+        choices=["throughput", "iops", "parity", "filesystem"],
+        default=None,
+        help=(
+            "Scoring profile to use in complex mode (default: filesystem with "
+            "--fs-mount, throughput otherwise)"
+        ),
     )
     parser.add_argument("--top", type=int, default=0, help="Show N best devices")
     parser.add_argument(
@@ -194,12 +205,66 @@ def main() -> int:
         default=None,
         help="Queue depths to sweep for random workloads",
     )
+    parser.add_argument(
+        "--knee",
+        action="store_true",
+        help=(
+            "Search each device's queue depth x numjobs saturation knee in "
+            "complex mode and run random/mixed tests at that point"
+        ),
+    )
+    parser.add_argument(
+        "--latency-slo",
+        type=float,
+        default=1.0,
+        metavar="MS",
+        help="p99 latency SLO in milliseconds for the --knee search",
+    )
     parser.add_argument(
         "--bs",
         type=str,
         nargs="*",
         default=None,
-        help="Block sizes to test (currently used for future extensions)",
+        help=(
+            "Run sequential, random and mixed tests for each block size in "
+            "complex mode, plus NFS-like bssplit mixes (default grid "
+            "4k..1m when given without values)"
+        ),
+    )
+    parser.add_argument(
+        "--bssplit",
+        nargs="*",
+        default=None,
+        metavar="SPEC",
+        help="Additional fio bssplit mixes, e.g. 4k/30:128k/20:1m/50",
+    )
+    parser.add_argument(
+        "--bssplit-from",
+        metavar="TRACE",
+        help="Derive a bssplit mix from the request sizes of a blkparse trace",
+    )
+    parser.add_argument(
+        "--ioengine",
+        choices=["libaio", "io_uring"],
+        default="libaio",
+        help="fio I/O engine for the basic sequential tests",
+    )
+    parser.add_argument(
+        "--engines",
+        nargs="*",
+        default=None,
+        choices=[
+            "libaio",
+            "io_uring",
+            "io_uring_hipri",
+            "io_uring_sqpoll",
+            "io_uring_fixed",
+        ],
+        help=(
+            "Compare I/O engines on each device in complex mode (all engines "
+            "when given without values); the best one is used for the "
+            "remaining tests"
+        ),
     )
     parser.add_argument(
         "--export",
@@ -210,6 +275,117 @@ def main() -> int:
             "(e.g. report/results.json)"
         ),
     )
+    parser.add_argument(
+        "--fs-mount",
+        nargs="*",
+        default=None,
+        metavar="MOUNTPOINT",
+        help=(
+            "Run file based workloads against mounted filesystems instead of "
+            "raw namespaces in complex mode (e.g. /mnt/data)"
+        ),
+    )
+    parser.add_argument(
+        "--fs-size",
+        default="16g",
+        help=(
+            "Size of the stream test file with --fs-mount; the file layout is "
+            "capped to half of the free space"
+        ),
+    )
+    parser.add_argument(
+        "--fs-files",
+        type=int,
+        default=1024,
+        help="Number of 1 MiB files for the many-file tests with --fs-mount",
+    )
+    parser.add_argument(
+        "--qos",
+        nargs="*",
+        choices=["seq_write", "rand_write", "read_flood"],
+        default=None,
+        metavar="BACKGROUND",
+        help=(
+            "Measure QD1 probe p99/p99.9 latency while background jobs run "
+            "(seq_write, rand_write, read_flood; all if none given, writes "
+            "require --allow-write)"
+        ),
+    )
+    parser.add_argument(
+        "--qos-depths",
+        type=int,
+        nargs="+",
+        help=(
+            "Total background queue depths for --qos (default 4 16 64 256); "
+            "depths above 32 run as 32-deep jobs and are rounded down"
+        ),
+    )
+    parser.add_argument(
+        "--zone-scan",
+        type=int,
+        nargs="?",
+        const=64,
+        default=None,
+        metavar="ZONES",
+        help=(
+            "Sample short read bursts at ZONES evenly spaced offsets (default "
+            "64) in complex mode and flag slow LBA regions"
+        ),
+    )
+    parser.add_argument(
+        "--zone-jobs",
+        type=int,
+        default=4,
+        help="Number of zones scanned concurrently",
+    )
+    parser.add_argument(
+        "--zone-write",
+        action="store_true",
+        help="Also scan zones with write bursts (requires --allow-write)",
+    )
+    parser.add_argument(
+        "--replay",
+        metavar="TRACE",
+        help=(
+            "Replay a blkparse trace (see fio_iolog.py, '.gz' accepted) on each "
+            "namespace in complex mode; writes are replayed only with "
+            "--allow-write"
+        ),
+    )
+    parser.add_argument(
+        "--replay-time-scale",
+        type=_positive_float,
+        default=1.0,
+        help="Replay speed-up factor relative to the recorded timing",
+    )
+    parser.add_argument(
+        "--metrics-textfile",
+        metavar="PATH",
+        help=(
+            "Publish live complex mode metrics to a node_exporter textfile "
+            "collector file (e.g. /var/lib/node_exporter/xitools_fio.prom)"
+        ),
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=None,
+        metavar="PORT",
+        help="Serve live complex mode metrics on http://0.0.0.0:PORT/metrics",
+    )
+    parser.add_argument(
+        "--trace",
+        metavar="PATH",
+        help=(
+            "Record phase timings in complex mode and write them as Chrome "
+            "trace-event JSON to PATH"
+        ),
+    )
+    parser.add_argument(
+        "--trace-summary",
+        action="store_true",
+        help="Print a per-phase timing summary after complex mode",
+    )
     parser.add_argument(
         "--no-smart",
         action="store_true",
@@ -224,8 +400,17 @@ def main() -> int:
 
     if args.complex:
         from complex_fio import run_complex
+        from fio_trace import TRACER
 
-        return run_complex(args)
+        if args.trace or args.trace_summary:
+            TRACER.enable()
+        try:
+            return run_complex(args)
+        finally:
+            if args.trace:
+                TRACER.write_chrome_trace(args.trace)
+            if args.trace_summary:
+                print(TRACER.format_summary())
 
     if shutil.which("fio") is None:
         print("fio not found in PATH", file=sys.stderr)
@@ -240,8 +425,8 @@ def main() -> int:
 
     results = []
     for dev in devs:
-        read_bw, read_iops = run_fio(dev, "read", args.debug)
-        write_bw, write_iops = run_fio(dev, "write", args.debug)
+        read_bw, read_iops = run_fio(dev, "read", args.debug, args.ioengine)
+        write_bw, write_iops = run_fio(dev, "write", args.debug, args.ioengine)
         results.append((dev, read_bw, read_iops, write_bw, write_iops))
 
     header = "{:<15} {:>15} {:>12} {:>15} {:>12}".format(
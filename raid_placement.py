@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""Score driven RAID member placement for ``raid_fs`` presets.
+
+Reads the JSON report exported by ``nvme_fio.py --complex --export json``
+and assigns drives to the xiRAID arrays and a spare pool:
+
+* drives with SMART or fio problems (non-empty ``reasons``) are never used
+* a RAID stripe runs at the speed of its slowest member, so each array, in
+  the order given, receives the drives that maximise its weakest member
+* when one NUMA node can supply an array whose weakest member is within
+  ``--numa-tolerance`` of the unconstrained choice, the array is kept local
+  to that node
+* the best remaining drives become hot spares
+
+The result is written as a complete ``raid_fs.yml`` preset; filesystem
+definitions are copied from a base preset with ``su_kb`` set to the array
+strip size and ``sw`` to the new number of data drives.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import re
+import sys
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence
+
+DEFAULT_BASE = "presets/default/raid_fs.yml"
+DEFAULT_ARRAYS = ["data:6:10:128", "log:1:2:16"]
+NUMA_TOLERANCE = 0.05
+PARITY_DISKS = {5: 1, 6: 2, 7: 3}
+
+
+@dataclass
+class Drive:
+    name: str
+    value: float
+    numa_node: int = -1
+    reasons: List[str] = field(default_factory=list)
+
+
+@dataclass
+class ArraySpec:
+    """Requested array: ``name:level:members:strip_size_kb``."""
+
+    name: str
+    level: int
+    members: int
+    strip_size_kb: int
+    devices: List[str] = field(default_factory=list)
+    weakest: float = 0.0
+    numa_node: Optional[int] = None
+
+    @classmethod
+    def parse(cls, text: str) -> "ArraySpec":
+        name, level, members, strip = text.split(":")
+        return cls(name, int(level), int(members), int(strip))
+
+    @property
+    def parity_disks(self) -> int:
+        return PARITY_DISKS.get(self.level, 0)
+
+    @property
+    def data_disks(self) -> int:
+        if self.level in (1, 10):
+            return max(self.members // 2, 1)
+        return self.members - self.parity_disks
+
+
+def load_drives(path: str, metric: str = "score") -> List[Drive]:
+    """Load drives from a complex_fio JSON export.
+
+    *metric* is ``score`` or a test name whose bandwidth (``seq*``) or IOPS
+    is used as the member value instead.
+    """
+    with open(path) as fh:
+        reports = json.load(fh)
+    drives = []
+    for rep in reports:
+        if metric == "score":
+            value = rep.get("score", 0.0)
+        else:
+            res = rep.get("results", {}).get(metric, {})
+            value = res.get("bw" if "seq" in metric else "iops", 0.0)
+        drives.append(
+            Drive(
+                rep["name"],
+                float(value),
+                rep.get("numa_node", -1),
+                list(rep.get("reasons", [])),
+            )
+        )
+    return drives
+
+
+def place(
+    drives: Sequence[Drive],
+    arrays: Sequence[ArraySpec],
+    spares: int = 0,
+    numa_tolerance: float = NUMA_TOLERANCE,
+) -> List[Drive]:
+    """Fill *arrays* in order from *drives* and return the spare drives.
+
+    Raises ``ValueError`` when there are not enough healthy drives.
+    """
+    pool = sorted((d for d in drives if not d.reasons), key=lambda d: d.value, reverse=True)
+    needed = sum(a.members for a in arrays) + spares
+    if len(pool) < needed:
+        raise ValueError(f"{needed} healthy drives needed, {len(pool)} available")
+    for arr in arrays:
+        # pool is sorted, so the first N drives maximise the weakest member
+        best = pool[: arr.members]
+        chosen = best
+        floor = best[-1].value * (1 - numa_tolerance)
+        by_node: Dict[int, List[Drive]] = {}
+        for d in pool:
+            if d.numa_node >= 0:
+                by_node.setdefault(d.numa_node, []).append(d)
+        local = [
+            members[: arr.members]
+            for members in by_node.values()
+            if len(members) >= arr.members and members[arr.members - 1].value >= floor
+        ]
+        if local:
+            chosen = max(local, key=lambda m: m[-1].value)
+            arr.numa_node = chosen[0].numa_node
+        taken = {d.name for d in chosen}
+        pool = [d for d in pool if d.name not in taken]
+        arr.devices = sorted(taken, key=_natural_key)
+        arr.weakest = chosen[-1].value
+    return pool[:spares]
+
+
+def _natural_key(name: str) -> List[object]:
+    return [int(t) if t.isdigit() else t for t in re.split(r"(\d+)", name)]
+
+
+# --------------------------- preset output ---------------------------------
+
+
+def _arrays_yaml(arrays: Sequence[ArraySpec], spare_pool: Optional[str]) -> List[str]:
+    lines = ["xiraid_arrays:"]
+    for i, arr in enumerate(arrays):
+        if i:
+            lines.append("")
+        lines += [
+            f"  - name: {arr.name}",
+            f"    level: {arr.level}",
+            f"    strip_size_kb: {arr.strip_size_kb}",
+            "    devices:",
+        ]
+        lines += [f"      - {dev}" for dev in arr.devices]
+        if arr.parity_disks:
+            lines.append(f"    parity_disks: {arr.parity_disks}")
+        if spare_pool and arr.parity_disks:
+            lines.append(f"    spare_pool: {spare_pool}")
+    return lines
+
+
+def render_preset(
+    base: str, arrays: Sequence[ArraySpec], spares: Sequence[Drive], pool_name: str = "sp1"
+) -> str:
+    """Return *base* preset text with arrays, spare pool, ``su_kb`` and ``sw`` replaced."""
+    out: List[str] = []
+    skipping = False
+    current_fs_data: Optional[str] = None
+    sw_by_dev = {f"/dev/xi_{a.name}": a.data_disks for a in arrays}
+    su_by_dev = {f"/dev/xi_{a.name}": a.strip_size_kb for a in arrays}
+    for line in base.splitlines():
+        if line[:1].strip():  # top-level key or comment ends the previous block
+            skipping = line.startswith(("xiraid_arrays:", "xiraid_spare_pools:"))
+            if line.startswith("xiraid_arrays:"):
+                out += _arrays_yaml(arrays, pool_name if spares else None)
+                if spares:
+                    out += ["", "xiraid_spare_pools:", f"  - name: {pool_name}", "    devices:"]
+                    out += [f"      - {d.name}" for d in spares]
+                out.append("")
+                continue
+        if skipping:
+            continue
+        m = re.match(r"\s+data_device:\s*\"?([^\"\s]+)", line)
+        if m:
+            current_fs_data = m.group(1)
+        m = re.match(r"(\s+sw:\s*)\d+", line)
+        if m and current_fs_data in sw_by_dev:
+            line = f"{m.group(1)}{sw_by_dev[current_fs_data]}"
+        m = re.match(r"(\s+su_kb:\s*)\d+", line)
+        if m and current_fs_data in su_by_dev:
+            line = f"{m.group(1)}{su_by_dev[current_fs_data]}"
+        out.append(line)
+    return "\n".join(out).rstrip("\n") + "\n"
+
+
+# --------------------------- main entry ------------------------------------
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Place drives into xiRAID arrays")
+    parser.add_argument("report", help="complex_fio JSON export (report/results.json)")
+    parser.add_argument(
+        "--array",
+        action="append",
+        metavar="NAME:LEVEL:MEMBERS:STRIP_KB",
+        help="Array to fill, in priority order (default: data:6:10:128 log:1:2:16)",
+    )
+    parser.add_argument("--spares", type=int, default=0, help="Drives for the spare pool")
+    parser.add_argument(
+        "--metric",
+        default="score",
+        help="Member value: 'score' or a test name such as seq_write or rand_write_qd32",
+    )
+    parser.add_argument("--numa-tolerance", type=float, default=NUMA_TOLERANCE)
+    parser.add_argument("--base", default=DEFAULT_BASE, help="Preset to copy filesystems from")
+    parser.add_argument("-o", "--output", help="Write the preset here instead of stdout")
+    args = parser.parse_args(argv)
+
+    arrays = [ArraySpec.parse(a) for a in (args.array or DEFAULT_ARRAYS)]
+    drives = load_drives(args.report, args.metric)
+    for d in drives:
+        if d.reasons:
+            print(f"excluded {d.name}: {', '.join(d.reasons)}", file=sys.stderr)
+    try:
+        spares = place(drives, arrays, args.spares, args.numa_tolerance)
+    except ValueError as exc:
+        print(f"placement failed: {exc}", file=sys.stderr)
+        return 1
+    for arr in arrays:
+        node = "mixed" if arr.numa_node is None else arr.numa_node
+        print(
+            f"{arr.name}: {len(arr.devices)} drives, weakest {args.metric}={arr.weakest:.3f}, "
+            f"NUMA {node}",
+            file=sys.stderr,
+        )
+    with open(args.base) as fh:
+        preset = render_preset(fh.read(), arrays, spares)
+    if args.output:
+        with open(args.output, "w") as fh:
+            fh.write(preset)
+    else:
+        print(preset, end="")
+    return 0
+
+
+if __name__ == "__main__":  # pragma: no cover - entrypoint
+    sys.exit(main())
@@ -0,0 +1,368 @@
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import complex_fio  # noqa: E402
+
+
+def test_fs_matrix_uses_directory_target():
+    tests = complex_fio.build_fs_test_matrix(allow_write=True, direct=False)
+    names = [t.name for t in tests]
+    assert "fs_fsync_write" in names
+    cmd = tests[0].build_cmd("/mnt/data/.xitools_fio")
+    assert "--directory" in cmd
+    assert "--filename" not in cmd
+    assert "--direct=0" in cmd
+
+
+def test_metadata_rates(tmp_path):
+    res = complex_fio.run_metadata_test(str(tmp_path), nfiles=50, repeat=2)
+    assert set(res.meta_ops) == {"create", "stat", "unlink"}
+    assert all(v > 0 for v in res.meta_ops.values())
+    assert res.iops > 0
+    assert not os.listdir(tmp_path / complex_fio.FS_WORKDIR / "meta")
+
+
+def test_write_job_reports_write_direction(monkeypatch):
+    out = {
+        "jobs": [
+            {
+                "read": {"bw": 0, "iops": 0, "total_ios": 0},
+                "write": {"bw": 2048, "iops": 16, "total_ios": 100},
+            }
+        ]
+    }
+    monkeypatch.setattr(
+        complex_fio.subprocess, "check_output", lambda *a, **k: json.dumps(out)
+    )
+    res = complex_fio._run_fio_once(["fio"])
+    assert res["bw"] == 2.0
+    assert res["iops"] == 16
+
+
+def test_percentiles_keep_p99_and_p999_apart(monkeypatch):
+    pct = {"99.000000": 200000, "99.900000": 900000}
+    out = {"jobs": [{"read": {"iops": 1, "total_ios": 1, "clat_ns": {"percentile": pct}}}]}
+    monkeypatch.setattr(
+        complex_fio.subprocess, "check_output", lambda *a, **k: json.dumps(out)
+    )
+    res = complex_fio._run_fio_once(["fio"])
+    assert (res["p99"], res["p99.9"]) == (0.2, 0.9)
+
+
+def test_engine_options_in_command():
+    test = complex_fio.build_engine_matrix(["io_uring_fixed"])[0]
+    cmd = test.build_cmd("/dev/nvme0n1")
+    assert cmd[cmd.index("--ioengine") + 1] == "io_uring"
+    assert "--fixedbufs=1" in cmd and "--registerfiles=1" in cmd
+
+
+def test_select_engine_prefers_cheaper_engine_within_tolerance():
+    R = complex_fio.FioResult
+    results = {
+        "engine_libaio": R(bw=0, iops=500_000, cpu_usr=20, cpu_sys=60),
+        "engine_io_uring": R(bw=0, iops=510_000, cpu_usr=10, cpu_sys=30),
+        "engine_io_uring_sqpoll": R(bw=0, iops=520_000, cpu_usr=100, cpu_sys=0),
+        "engine_io_uring_hipri": R(bw=0, iops=0),
+        "seq_read": R(bw=1, iops=1),
+    }
+    assert complex_fio.select_engine(results) == "io_uring"
+    assert complex_fio.select_engine({}) is None
+
+
+def test_cpu_efficiency_metrics(monkeypatch):
+    out = {
+        "jobs": [
+            {
+                "read": {"bw": 400_000, "iops": 100_000, "total_ios": 10},
+                "write": {"bw": 0, "iops": 0, "total_ios": 0},
+                "usr_cpu": 20.0,
+                "sys_cpu": 30.0,
+                "ctx": 1234,
+            }
+        ]
+    }
+    monkeypatch.setattr(
+        complex_fio.subprocess, "check_output", lambda *a, **k: json.dumps(out)
+    )
+    monkeypatch.setattr(complex_fio, "_read_cpu_times", lambda: None)
+    test = complex_fio.FioTest("rand_read_qd32", "randread", "4k", 32)
+    res = complex_fio.run_test("/dev/nvme0n1", test, repeat=2)
+    assert res.ctx == 1234
+    assert res.cpu_cores == 0.5
+    assert res.iops_per_core == 200_000
+    assert res.cpu_us_per_io == 5.0
+
+
+def test_efficiency_scoring_prefers_cpu_headroom():
+    R = complex_fio.FioResult
+    lean = complex_fio.DeviceReport("a", results={"seq_read": R(bw=1, iops=1, iops_per_core=4)})
+    busy = complex_fio.DeviceReport("b", results={"seq_read": R(bw=1, iops=1, iops_per_core=1)})
+    complex_fio.apply_scoring([lean, busy], "throughput")
+    assert lean.score > busy.score
+
+
+def test_find_saturation_on_synthetic_curve():
+    calls = []
+
+    def measure(qd, numjobs):
+        depth = qd * numjobs
+        calls.append(depth)
+        # IOPS saturate at 1M around depth 64, latency follows Little's law
+        iops = 1_000_000 * min(depth, 64) / 64
+        return complex_fio.FioResult(bw=0, iops=iops, lat_p99=depth / iops * 1000 * 2)
+
+    sat = complex_fio.find_saturation(measure, slo_ms=0.3)
+    assert (sat["knee"]["qd"], sat["knee"]["numjobs"]) == (32, 2)
+    assert sat["slo"]["qd"] * sat["slo"]["numjobs"] == 128
+    assert sat["runs"] == len(set(calls)) < 11
+    assert all(d in (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024) for d in calls)
+
+
+def test_apply_knee_only_retunes_mixed_tests():
+    tests = complex_fio.build_test_matrix(allow_write=False, qd_sweep=[1, 32])
+    sat = {"knee": {"qd": 16, "numjobs": 2, "iops": 1.0, "lat_p99": 0.1}}
+    tuned = {t.name: t for t in complex_fio.apply_knee(tests, sat)}
+    assert tuned["mixed_70_30"].qd == 16
+    assert tuned["mixed_70_30"].extra["numjobs"] == "2"
+    assert tuned["rand_read_qd32"].qd == 32
+    assert tuned["seq_read"].qd == 32
+
+
+def test_block_size_grid_and_bssplit():
+    tests = complex_fio.build_test_matrix(
+        allow_write=True,
+        qd_sweep=[32],
+        block_sizes=["4k", "1m"],
+        bssplits={"x": "4k/50:1m/50"},
+    )
+    by_name = {t.name: t for t in tests}
+    assert by_name["seq_write_bs1m"].bs == "1m"
+    assert by_name["mixed_70_30_bs4k"].rwmixread == 70
+    assert "--bssplit=4k/50:1m/50" in by_name["bssplit_x"].build_cmd("/dev/nvme0n1")
+    R = complex_fio.FioResult
+    results = {
+        "seq_read_bs4k": R(bw=100, iops=1),
+        "seq_read_bs1m": R(bw=3000, iops=1),
+        "seq_read": R(bw=1, iops=1),
+        "bssplit_x": R(bw=1, iops=1),
+    }
+    curves = complex_fio.bs_curves(results)
+    assert curves == {"seq_read": {"4k": 100, "1m": 3000}}
+
+
+def test_bssplit_from_histogram():
+    hist = {4096: 500, 3000: 100, 32768: 200, 1048576: 195, 65536: 5}
+    assert complex_fio.bssplit_from_histogram(hist) == "4k/61:32k/20:1m/19"
+    assert complex_fio.bssplit_from_histogram({}) == ""
+
+
+def test_zone_scan_offsets_and_outliers(monkeypatch):
+    capacity = 30 * 2**40
+    tests = complex_fio.build_zone_tests(capacity, zones=8)
+    offsets = [int(t.extra["offset"]) for t in tests]
+    assert offsets[0] == 0 and offsets[-1] + int(tests[-1].extra["size"]) <= capacity
+    assert all(o % complex_fio.ZONE_ALIGN == 0 for o in offsets)
+    assert int(tests[0].extra["size"]) == complex_fio.ZONE_SPAN
+    cmd = tests[3].build_cmd("/dev/nvme0n1")
+    assert f"--offset={offsets[3]}" in cmd and "--runtime=2" in cmd
+
+    def fake_run(cmd):
+        slow = f"--offset={offsets[5]}" in cmd
+        return {"bw": 500.0 if slow else 3000.0, "iops": 1.0, "p99": 1.0}
+
+    monkeypatch.setattr(complex_fio, "_run_fio_once", fake_run)
+    zones = complex_fio.scan_zones("/dev/nvme0n1", tests, concurrency=3)
+    assert [z.index for z in zones if z.outlier] == [5]
+    assert complex_fio.zone_map(zones, "read") == ".....x.."
+
+
+def test_qos_point_parses_probe_and_background(monkeypatch):
+    cmd = complex_fio.build_qos_cmd("/dev/nvme0n1", "seq_write", 64)
+    assert cmd.count("--name") == 2 and cmd[-1] == "--new_group"
+    assert "--numjobs=2" in cmd and "--iodepth=1" in cmd
+    assert "--offset_increment=50%" in cmd and "--size=50%" in cmd
+    rand = complex_fio.build_qos_cmd("/dev/nvme0n1", "rand_write", 64)
+    assert not any(arg.startswith("--offset_increment") for arg in rand)
+
+    def job(iops, p99, p999):
+        pct = {"99.000000": p99 * 1e6, "99.900000": p999 * 1e6}
+        return {"write": {"bw": 2048 * 1024, "iops": iops, "total_ios": 10,
+                          "clat_ns": {"percentile": pct}}}
+
+    data = {"jobs": [job(1000, 0.2, 0.9), job(16000, 5.0, 9.0)]}
+    monkeypatch.setattr(complex_fio, "_exec_fio", lambda cmd: data)
+    point = complex_fio.run_qos_point("/dev/nvme0n1", "seq_write", 64)
+    assert (point.bg_iops, point.probe_p99, point.probe_p999) == (16000, 0.2, 0.9)
+    assert complex_fio.run_qos_point("/dev/nvme0n1", "seq_write", 100).depth == 96
+    assert complex_fio.qos_backgrounds(complex_fio.QOS_BACKGROUND, False) == ["read_flood"]
+
+
+def test_qos_scoring_prefers_lower_tail():
+    calm = complex_fio.DeviceReport(name="calm")
+    noisy = complex_fio.DeviceReport(name="noisy")
+    calm.qos["seq_write"] = [complex_fio.QosPoint(16, 2000, 1, 0.1, 0.2)]
+    noisy.qos["seq_write"] = [complex_fio.QosPoint(16, 2000, 1, 1.0, 4.0)]
+    complex_fio.apply_scoring([calm, noisy], "parity")
+    assert calm.score > noisy.score
+    for weights in complex_fio.PROFILES.values():
+        assert abs(sum(weights.values()) - 1.0) < 1e-9
+
+
+def test_fs_mount_defaults_to_filesystem_profile(monkeypatch):
+    seen = []
+    monkeypatch.setattr(complex_fio, "_run_complex", lambda args, m: seen.append(args.profile))
+    base = dict(metrics_textfile=None, metrics_port=None)
+    complex_fio.run_complex(argparse.Namespace(profile=None, fs_mount=["/mnt/data"], **base))
+    complex_fio.run_complex(argparse.Namespace(profile=None, fs_mount=None, **base))
+    complex_fio.run_complex(argparse.Namespace(profile="iops", fs_mount=["/mnt"], **base))
+    assert seen == ["filesystem", "throughput", "iops"]
+
+
+def test_fs_layout_capped_by_free_space(monkeypatch):
+    free = os.statvfs_result((4096, 4096, 0, 0, 2 * 2**30 // 4096, 0, 0, 0, 0, 255))
+    monkeypatch.setattr(complex_fio.os, "statvfs", lambda path: free)
+    stream, nfiles = complex_fio.fs_layout("/mnt", "16g", 1024)
+    assert stream + nfiles * complex_fio.FS_FILE_SIZE <= 2**30
+    assert stream % complex_fio.FS_FILE_SIZE == 0 and nfiles < 1024
+    assert complex_fio.fs_layout("/mnt", "256m", 64) == (256 * 2**20, 64)
+
+
+def _dry_run_reports(monkeypatch, *argv, smart=lambda dev: {}):
+    """Run ``nvme_fio.py --complex --dry-run`` on one fake namespace."""
+    import nvme_fio
+
+    reports = []
+    monkeypatch.setattr(nvme_fio, "discover_nvme_namespaces", lambda *a, **k: ["/dev/nvme9n1"])
+    monkeypatch.setattr(nvme_fio, "select_namespaces", lambda devs, *a, **k: devs)
+    monkeypatch.setattr(complex_fio, "collect_smart", smart)
+    monkeypatch.setattr(complex_fio, "_finish", lambda reps, args: reports.extend(reps) or 0)
+    monkeypatch.setattr(sys, "argv", ["nvme_fio.py", "--complex", "--dry-run", *argv])
+    assert nvme_fio.main() == 0
+    return reports
+
+
+def test_engine_runs_kept_out_of_scored_results(monkeypatch):
+    (report,) = _dry_run_reports(monkeypatch, "--engines", "libaio", "io_uring")
+    assert sorted(report.engine_results) == ["engine_io_uring", "engine_libaio"]
+    assert not any(name.startswith("engine_") for name in report.results)
+
+
+def test_progress_counts_every_run_and_refreshes_smart(monkeypatch, tmp_path):
+    textfile = tmp_path / "fio.prom"
+    smart_reads = []
+    monkeypatch.setattr(complex_fio, "device_capacity", lambda dev: 2**40)
+    reports = _dry_run_reports(
+        monkeypatch, "--knee", "--qos", "--qos-depths", "4", "--zone-scan", "8",
+        "--metrics-textfile", str(textfile),
+        smart=lambda dev: smart_reads.append(dev) or {"temperature": 40},
+    )
+    monkeypatch.undo()
+    assert reports[0].zones and reports[0].qos
+    values = {}
+    for line in textfile.read_text().splitlines():
+        if line.startswith("xitools_fio_tests_"):
+            name, value = line.split("{")[0], float(line.rsplit(" ", 1)[1])
+            values[name] = value
+    assert values["xitools_fio_tests_completed"] == values["xitools_fio_tests_total"]
+    # initial SMART read plus one per run, the zone scan counting as one
+    assert len(smart_reads) > values["xitools_fio_tests_total"] - 8
+
+
+def test_replay_iolog_removed_after_run(monkeypatch, tmp_path):
+    trace = tmp_path / "trace.txt"
+    trace.write_text("259,0 1 1 0.000100000 42 Q R 2048 + 8 [nfsd]\n")
+    scratch = tmp_path / "scratch"
+    scratch.mkdir()
+    monkeypatch.setattr(complex_fio.tempfile, "tempdir", str(scratch))
+    monkeypatch.setattr(complex_fio, "device_capacity", lambda dev: 2**30)
+    (report,) = _dry_run_reports(monkeypatch, "--replay", str(trace))
+    assert "replay" in report.results
+    assert os.listdir(scratch) == []
+
+
+def test_zone_read_and_write_passes_do_not_overlap(monkeypatch):
+    import threading
+
+    tests = complex_fio.build_zone_tests(2**40, zones=8)
+    tests += complex_fio.build_zone_tests(2**40, zones=8, rw="write")
+    events, lock = [], threading.Lock()
+
+    def fake_run(cmd):
+        rw = cmd[cmd.index("--rw") + 1]
+        with lock:
+            events.append(("start", rw))
+        time.sleep(0.01)
+        with lock:
+            events.append(("end", rw))
+        return {"bw": 1000.0, "iops": 1.0, "p99": 1.0}
+
+    monkeypatch.setattr(complex_fio, "_run_fio_once", fake_run)
+    zones = complex_fio.scan_zones("/dev/nvme0n1", tests, concurrency=3)
+    first_write = events.index(("start", "write"))
+    assert ("end", "read") not in events[first_write:]
+    assert [z.index for z in zones if z.rw == "write"] == list(range(8))
+    assert not any(z.outlier for z in zones)
+
+
+def test_replay_trace_problems_are_reported(monkeypatch, tmp_path, capsys):
+    import nvme_fio
+
+    monkeypatch.setattr(nvme_fio, "discover_nvme_namespaces", lambda *a, **k: ["/dev/nvme9n1"])
+    monkeypatch.setattr(sys, "argv", ["nvme_fio.py", "--complex", "--dry-run",
+                                      "--replay", str(tmp_path / "missing.txt")])
+    assert nvme_fio.main() == 1
+    assert "Cannot read replay trace" in capsys.readouterr().out
+
+    def unreadable(*args, **kwargs):
+        raise PermissionError("trace vanished")
+
+    monkeypatch.setattr(complex_fio, "convert_trace", unreadable)
+    trace = tmp_path / "trace.txt"
+    trace.write_text("")
+    (report,) = _dry_run_reports(monkeypatch, "--replay", str(trace))
+    assert report.reasons == ["replay error: trace vanished"]
+
+    monkeypatch.setattr(sys, "argv", ["nvme_fio.py", "--replay-time-scale", "0"])
+    with pytest.raises(SystemExit):
+        nvme_fio.main()
+
+
+def test_fs_samples_published_under_mountpoint(tmp_path):
+    from fio_metrics import BenchmarkMetrics
+
+    metrics = BenchmarkMetrics()
+    test = complex_fio.build_fs_test_matrix(allow_write=False, stream_size="1m", nfiles=1)[:1]
+    complex_fio.run_filesystem("/mnt/data", False, 1, dry_run=True, tests=test, metrics=metrics)
+    devices = {
+        line.split('device="', 1)[1].split('"', 1)[0]
+        for line in metrics.registry.render().splitlines()
+        if 'device="' in line
+    }
+    assert devices == {"/mnt/data"}
+
+
+def test_engine_results_exported_and_printed(tmp_path, capsys):
+    R = complex_fio.FioResult
+    rep = complex_fio.DeviceReport(name="/dev/nvme0n1", engine="io_uring")
+    rep.engine_results = {
+        "engine_libaio": R(bw=0, iops=400_000, lat_p50=0.08, cpu_us_per_io=2.5),
+        "engine_io_uring": R(bw=0, iops=500_000, lat_p50=0.06, cpu_us_per_io=1.5),
+    }
+    complex_fio.export_reports([rep], ["csv"], str(tmp_path))
+    with open(tmp_path / "results_engines.csv") as fh:
+        rows = list(csv.DictReader(fh))
+    assert [(r["engine"], r["selected"], r["iops"]) for r in rows] == [
+        ("io_uring", "1", "500000"),
+        ("libaio", "0", "400000"),
+    ]
+    args = argparse.Namespace(profile="iops", top=0, bottom=0, export=None)
+    complex_fio._finish([rep], args)
+    assert "libaio: 400000 IOPS p50=0.080ms p99=0.000ms cpu=2.50us/IO" in capsys.readouterr().out
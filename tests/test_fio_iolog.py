@@ -0,0 +1,58 @@
+import gzip
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fio_iolog  # noqa: E402
+
+BLKPARSE = """\
+259,0    3        1     0.000000000  697  Q   R 2048 + 8 [nfsd]
+259,0    3        2     0.000010000  697  D   R 2048 + 8 [nfsd]
+259,0    3        3     0.500000000  697  Q  WS 4096 + 256 [nfsd]
+259,0    3        4     1.000000000  697  Q   R 8192 + 8 [nfsd]
+259,0    3        5     1.000100000  697  C   R 8192 + 8 [0]
+CPU3 (259,0):
+ Reads Queued:           2,        8KiB	 Writes Queued:           1,      128KiB
+"""
+
+
+def test_convert_blkparse_with_scaling(tmp_path):
+    trace = tmp_path / "trace.txt.gz"
+    with gzip.open(trace, "wt") as fh:
+        fh.write(BLKPARSE)
+    iolog = tmp_path / "out.iolog"
+    stats = fio_iolog.convert_trace(
+        str(trace),
+        str(iolog),
+        "/dev/nvme0n1",
+        target_size=8192 * 512 // 2,
+        source_size=8192 * 512,
+        time_scale=2.0,
+    )
+    lines = iolog.read_text().splitlines()
+    assert lines[:3] == ["fio version 3 iolog", "0 /dev/nvme0n1 add", "0 /dev/nvme0n1 open"]
+    assert lines[3:6] == [
+        "0 /dev/nvme0n1 read 524288 4096",
+        "250 /dev/nvme0n1 write 1048576 131072",
+        "500 /dev/nvme0n1 read 2093056 4096",
+    ]
+    assert lines[-1] == "500 /dev/nvme0n1 close"
+    assert (stats.ios, stats.bytes, stats.duration) == (3, 139264, 1.0)
+    assert stats.rate(2.0) == 6.0
+
+
+def test_stat_samples_stream_reads_only(tmp_path):
+    samples = [
+        (0.0, [0, 0, 0, 0, 0, 0, 0, 0]),
+        (1.0, [4, 0, 32, 0, 2, 0, 16, 0]),
+        (2.0, [8, 0, 64, 0, 2, 0, 16, 0]),
+    ]
+    events = fio_iolog.events_from_stat_samples(iter(samples), capacity=1 << 20)
+    path = tmp_path / "s.iolog"
+    with open(path, "w") as fh:
+        stats = fio_iolog.write_iolog(events, fh, "/dev/nvme1n1", reads_only=True)
+    assert stats.ios == 8
+    body = path.read_text()
+    assert " write " not in body
+    assert all(int(l.split()[3]) % 4096 == 0 for l in body.splitlines()[3:-1])
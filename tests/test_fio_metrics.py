@@ -0,0 +1,39 @@
+import os
+import sys
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fio_metrics  # noqa: E402
+
+
+def test_http_endpoint_scrape():
+    metrics = fio_metrics.BenchmarkMetrics(port=0)
+    try:
+        metrics.progress("/dev/nvme0n1", "seq_read", 0, 4, running=True)
+        metrics.sample(
+            "/dev/nvme0n1", "seq_read", {"bw": 1.0, "iops": 8.0, "p99": 0.2}, duration=61.0
+        )
+        metrics.smart("/dev/nvme0n1", {"temperature": 41})
+        port = metrics.server.server_address[1]
+        body = urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics").read().decode()
+    finally:
+        metrics.close()
+    labels = 'device="/dev/nvme0n1",test="seq_read"'
+    assert f"xitools_fio_bandwidth_bytes{{{labels}}} 1048576.0" in body
+    assert (
+        'xitools_fio_latency_seconds{device="/dev/nvme0n1",quantile="0.99",test="seq_read"} 0.0002'
+        in body
+    )
+    assert f'xitools_fio_run_duration_seconds_bucket{{{labels},le="60.0"}} 0' in body
+    assert f'xitools_fio_run_duration_seconds_bucket{{{labels},le="+Inf"}} 1' in body
+    assert "# TYPE xitools_fio_run_duration_seconds histogram" in body
+    assert 'xitools_fio_smart_temperature_celsius{device="/dev/nvme0n1"} 41.0' in body
+
+
+def test_textfile_rewritten_atomically(tmp_path):
+    path = tmp_path / "xitools_fio.prom"
+    metrics = fio_metrics.BenchmarkMetrics(textfile=str(path))
+    metrics.progress("/dev/nvme0n1", "seq_read", 1, 4, running=False)
+    assert 'xitools_fio_tests_completed{device="/dev/nvme0n1"} 1.0' in path.read_text()
+    assert os.listdir(tmp_path) == ["xitools_fio.prom"]
@@ -0,0 +1,48 @@
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import complex_fio  # noqa: E402
+from fio_trace import TRACER, Tracer  # noqa: E402
+
+
+def test_disabled_tracer_records_nothing():
+    tracer = Tracer()
+    with tracer.span("x", dev="/dev/nvme0n1"):
+        pass
+    tracer.record("y", 0.0, 1.0)
+    assert tracer.spans == []
+
+
+def test_run_test_spans_and_chrome_trace(monkeypatch, tmp_path):
+    out = {
+        "jobs": [
+            {
+                "read": {"bw": 1024, "iops": 10, "total_ios": 10},
+                "elapsed": 70,
+                "job_runtime": 60000,
+            }
+        ]
+    }
+    monkeypatch.setattr(
+        complex_fio.subprocess, "check_output", lambda *a, **k: json.dumps(out)
+    )
+    TRACER.enable()
+    try:
+        test = complex_fio.FioTest("seq_read", "read", "128k", 32)
+        complex_fio.run_test("/dev/nvme0n1", test, repeat=2)
+        path = tmp_path / "trace.json"
+        TRACER.write_chrome_trace(str(path))
+        summary = {row[0]: row[1] for row in TRACER.summary()}
+    finally:
+        TRACER.enabled = False
+        TRACER.clear()
+    events = json.loads(path.read_text())["traceEvents"]
+    run = [e for e in events if e["name"] == "run_test"]
+    assert len(run) == 1 and run[0]["args"] == {"dev": "/dev/nvme0n1", "test": "seq_read"}
+    assert run[0]["ph"] == "X"
+    ramp = [e for e in events if e["name"] == "fio.ramp"]
+    assert ramp[0]["dur"] == 10e6
+    assert summary["fio.process"] == 2 and summary["fio.parse"] == 2
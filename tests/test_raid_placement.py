@@ -0,0 +1,55 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import raid_placement as rp  # noqa: E402
+
+BASE = os.path.join(os.path.dirname(__file__), "..", "presets", "default", "raid_fs.yml")
+
+
+def _drives():
+    # node 0 drives are slightly slower than node 1, one node 1 drive is flagged
+    drives = [rp.Drive(f"/dev/nvme{i}n1", 1.0 - i * 0.001, numa_node=i % 2) for i in range(12)]
+    drives[1].reasons.append("media errors >0")
+    drives[1].value = 2.0
+    return drives
+
+
+def test_place_prefers_numa_local_and_skips_flagged():
+    arrays = [rp.ArraySpec.parse("data:5:4:128"), rp.ArraySpec.parse("log:1:2:16")]
+    spares = rp.place(_drives(), arrays, spares=1)
+    assert "/dev/nvme1n1" not in arrays[0].devices + arrays[1].devices
+    assert arrays[0].numa_node == 0
+    assert arrays[0].devices == ["/dev/nvme0n1", "/dev/nvme2n1", "/dev/nvme4n1", "/dev/nvme6n1"]
+    assert arrays[1].devices == ["/dev/nvme3n1", "/dev/nvme5n1"]
+    assert len(spares) == 1 and spares[0].name == "/dev/nvme7n1"
+
+
+def test_place_goes_cross_numa_when_local_is_too_slow():
+    drives = [rp.Drive(f"/dev/nvme{i}n1", 1.0 if i < 4 else 0.5, numa_node=i % 2) for i in range(8)]
+    arr = rp.ArraySpec.parse("data:5:4:128")
+    rp.place(drives, [arr])
+    assert arr.numa_node is None and arr.weakest == 1.0
+
+
+def test_render_preset_updates_sw_and_spares():
+    arrays = [rp.ArraySpec.parse("data:6:6:64"), rp.ArraySpec.parse("log:1:2:16")]
+    spares = rp.place(_drives(), arrays, spares=2)
+    with open(BASE) as fh:
+        text = rp.render_preset(fh.read(), arrays, spares)
+    assert "    sw: 4\n" in text
+    assert "    su_kb: 64\n" in text
+    assert "    strip_size_kb: 64\n" in text
+    assert "    spare_pool: sp1\n" in text
+    assert text.count("xiraid_spare_pools:") == 1
+    assert "/dev/nvme12n1" not in text
+
+
+def test_place_scales_to_hundreds_of_drives():
+    drives = [rp.Drive(f"/dev/nvme{i}n1", (i * 7919) % 1000, numa_node=i % 4) for i in range(800)]
+    arrays = [rp.ArraySpec.parse(f"a{i}:6:24:128") for i in range(30)]
+    start = time.perf_counter()
+    rp.place(drives, arrays, spares=20)
+    assert time.perf_counter() - start < 1.0
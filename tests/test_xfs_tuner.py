@@ -0,0 +1,57 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import xfs_tuner  # noqa: E402
+from complex_fio import FioResult  # noqa: E402
+
+
+def test_candidate_matches_default_preset():
+    cand = xfs_tuner.XfsCandidate(128, 8, "1G", "256k", "131072k")
+    frag = xfs_tuner.preset_fragment(cand)
+    with open(os.path.join(os.path.dirname(__file__), "..", "presets", "default", "raid_fs.yml")) as fh:
+        preset = fh.read()
+    assert preset.rstrip().endswith(frag.rstrip())
+    assert cand.mkfs_cmd("/dev/loop0", "/dev/loop1", "x")[-1] == "/dev/loop0"
+
+
+def test_rank_orders_failed_candidates_last():
+    grid = xfs_tuner.candidate_grid([64, 128], [8], ["1G"], ["256k"], ["64m"])
+    assert len(grid) == 2
+    good = xfs_tuner.DeviceReport(name=grid[0].label)
+    good.results["fs_seq_read"] = FioResult(bw=100.0, iops=1.0)
+    bad = xfs_tuner.DeviceReport(name=grid[1].label, reasons=["mkfs/mount failed"])
+    ranked = xfs_tuner.rank([bad, good])
+    assert ranked[0] is good and ranked[0].score > 0
+
+
+def test_loop_images_need_explicit_dir(tmp_path, capsys):
+    with pytest.raises(SystemExit) as exc:
+        xfs_tuner.main(["--loop-size", "1G", "--dry-run"])
+    assert exc.value.code == 2
+    assert "--image-dir" in capsys.readouterr().err
+    argv = ["--loop-size", "1G", "--image-dir", str(tmp_path), "--dry-run", "--su-kb", "64",
+            "--logbsize", "64k", "--allocsize", "64m", "--runtime", "1"]
+    assert xfs_tuner.main(argv) == 0
+    out = capsys.readouterr().out
+    assert f"truncate -s 1G {tmp_path}/xfs_tuner." in out
+    assert os.listdir(tmp_path) == []
+
+
+def test_layout_fits_small_scratch_device(monkeypatch, tmp_path, capsys):
+    free = os.statvfs_result((4096, 4096, 0, 0, 512 * 2**20 // 4096, 0, 0, 0, 0, 255))
+    monkeypatch.setattr(xfs_tuner.os, "statvfs", lambda path: free)
+    cand = xfs_tuner.XfsCandidate(64, 8, "1G", "64k", "64m")
+    report = xfs_tuner.evaluate(cand, "/dev/loopX", None, str(tmp_path), 1, dry_run=True)
+    assert not report.reasons
+    sizes = [
+        int(arg.split("=", 1)[1])
+        for line in capsys.readouterr().out.splitlines()
+        if line.startswith("+ fio")
+        for arg in line.split()
+        if arg.startswith("--size=")
+    ]
+    assert sizes and sum(set(sizes)) <= 256 * 2**20
@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""XFS mkfs/mount parameter tuner for scratch block devices.
+
+The ``raid_fs`` role formats the data array with the geometry and mount
+options stored in ``xfs_filesystems``.  This utility builds XFS on a scratch
+device (a real block device or a loop device backed by a sparse file) for
+every combination of candidate parameters, runs a short filesystem workload
+from ``complex_fio`` against each one and ranks the results.  The winner is
+printed as a ``raid_fs.yml`` fragment in the same layout as the presets in
+``presets/*/raid_fs.yml``.
+
+All data on the scratch devices is destroyed.
+"""
+from __future__ import annotations
+
+import argparse
+import itertools
+import os
+import subprocess
+import sys
+import tempfile
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
+
+from complex_fio import (
+    DeviceReport,
+    apply_scoring,
+    build_fs_test_matrix,
+    fs_layout,
+    run_filesystem,
+)
+
+DEFAULT_SU_KB = [64, 128, 256]
+DEFAULT_SW = [8]
+DEFAULT_LOG_SIZE = ["1G"]
+DEFAULT_LOGBSIZE = ["64k", "256k"]
+DEFAULT_ALLOCSIZE = ["64m", "131072k"]
+# mount options shared by all candidates, matching the shipped presets
+BASE_MOUNT_OPTS = ["noatime", "nodiratime", "largeio", "inode64", "swalloc"]
+TUNER_RUNTIME = 10
+TUNER_STREAM_SIZE = "1g"
+TUNER_FILES = 128
+
+
+@dataclass
+class XfsCandidate:
+    """A single mkfs geometry and mount option combination."""
+
+    su_kb: int
+    sw: int
+    log_size: str
+    logbsize: str
+    allocsize: str
+    sector_size: str = "4k"
+
+    @property
+    def label(self) -> str:
+        return (
+            f"su{self.su_kb}k-sw{self.sw}-log{self.log_size}"
+            f"-lbs{self.logbsize}-alloc{self.allocsize}"
+        )
+
+    def mkfs_cmd(self, data_dev: str, log_dev: Optional[str], label: str) -> List[str]:
+        """Return the ``mkfs.xfs`` command used by ``create_fs.yml``."""
+        log = f"logdev={log_dev},size={self.log_size}" if log_dev else f"size={self.log_size}"
+        return [
+            "mkfs.xfs",
+            "-f",
+            "-L",
+            label,
+            "-d",
+            f"su={self.su_kb}k,sw={self.sw}",
+            "-l",
+            log,
+            "-s",
+            f"size={self.sector_size}",
+            data_dev,
+        ]
+
+    def mount_opts(self, log_dev: Optional[str]) -> str:
+        """Return mount options in the order used by the presets."""
+        opts = [f"logdev={log_dev}"] if log_dev else []
+        opts.extend(BASE_MOUNT_OPTS[:2])
+        opts.append(f"logbsize={self.logbsize}")
+        opts.extend(BASE_MOUNT_OPTS[2:])
+        opts.append(f"allocsize={self.allocsize}")
+        return ",".join(opts)
+
+
+def candidate_grid(
+    su_kb: Sequence[int],
+    sw: Sequence[int],
+    log_size: Sequence[str],
+    logbsize: Sequence[str],
+    allocsize: Sequence[str],
+) -> List[XfsCandidate]:
+    """Return the cartesian product of all candidate parameters."""
+    return [
+        XfsCandidate(*combo)
+        for combo in itertools.product(su_kb, sw, log_size, logbsize, allocsize)
+    ]
+
+
+# --------------------------- device helpers --------------------------------
+
+
+def _run(cmd: List[str], dry_run: bool) -> str:
+    if dry_run:
+        print("+ " + " ".join(cmd))
+        return ""
+    return subprocess.check_output(cmd, text=True, stderr=subprocess.STDOUT).strip()
+
+
+def attach_loop(image: str, size: str, dry_run: bool = False) -> str:
+    """Create sparse *image* of *size* and attach it to a free loop device."""
+    _run(["truncate", "-s", size, image], dry_run)
+    dev = _run(["losetup", "--find", "--show", "--direct-io=on", image], dry_run)
+    return "/dev/loopX" if dry_run else dev
+
+
+def detach_loop(dev: str, dry_run: bool = False) -> None:
+    try:
+        _run(["losetup", "-d", dev], dry_run)
+    except (OSError, subprocess.CalledProcessError) as exc:
+        print(f"failed to detach {dev}: {exc}", file=sys.stderr)
+
+
+# --------------------------- evaluation ------------------------------------
+
+
+def evaluate(
+    cand: XfsCandidate,
+    data_dev: str,
+    log_dev: Optional[str],
+    mountpoint: str,
+    runtime: int,
+    repeat: int = 1,
+    dry_run: bool = False,
+) -> DeviceReport:
+    """Format, mount and benchmark *cand*; return its report."""
+    report = DeviceReport(name=cand.label)
+    try:
+        _run(cand.mkfs_cmd(data_dev, log_dev, "xituner"), dry_run)
+        _run(["mount", "-o", cand.mount_opts(log_dev), data_dev, mountpoint], dry_run)
+    except (OSError, subprocess.CalledProcessError) as exc:
+        output = getattr(exc, "output", "") or str(exc)
+        report.reasons.append(f"mkfs/mount failed: {output.strip()}")
+        return report
+    try:
+        # small scratch devices cannot hold the default layout
+        stream, nfiles = fs_layout(mountpoint, TUNER_STREAM_SIZE, TUNER_FILES)
+        tests = build_fs_test_matrix(
+            allow_write=True, stream_size=str(stream), nfiles=nfiles, runtime=runtime
+        )
+        if dry_run:
+            for test in tests:
+                print("+ " + " ".join(test.build_cmd(mountpoint)))
+        fs_report = run_filesystem(
+            mountpoint,
+            allow_write=True,
+            repeat=repeat,
+            dry_run=dry_run,
+            tests=tests,
+            meta_files=2000,
+        )
+        report.results = fs_report.results
+        report.reasons.extend(fs_report.reasons)
+    finally:
+        try:
+            _run(["umount", mountpoint], dry_run)
+        except (OSError, subprocess.CalledProcessError) as exc:
+            print(f"failed to unmount {mountpoint}: {exc}", file=sys.stderr)
+    return report
+
+
+def rank(reports: List[DeviceReport]) -> List[DeviceReport]:
+    """Score *reports* with the filesystem profile, best first."""
+    ok = [r for r in reports if not r.reasons]
+    if ok:
+        apply_scoring(ok, "filesystem")
+    return sorted(reports, key=lambda r: (not r.reasons, r.score), reverse=True)
+
+
+def preset_fragment(
+    cand: XfsCandidate,
+    label: str = "nfsdata",
+    data_device: str = "/dev/xi_data",
+    log_device: str = "/dev/xi_log",
+    mountpoint: str = "/mnt/data",
+) -> str:
+    """Return an ``xfs_filesystems`` block for ``raid_fs.yml``."""
+    return "\n".join(
+        [
+            "xfs_filesystems:",
+            f"  - label: {label}",
+            f'    data_device: "{data_device}"',
+            f'    log_device: "{log_device}"',
+            f"    su_kb: {cand.su_kb}",
+            f"    sw: {cand.sw}",
+            f"    log_size: {cand.log_size}",
+            f"    sector_size: {cand.sector_size}",
+            f"    mountpoint: {mountpoint}",
+            f'    mount_opts: "{cand.mount_opts(log_device)}"',
+            "",
+        ]
+    )
+
+
+# --------------------------- main entry ------------------------------------
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Tune XFS mkfs/mount parameters")
+    src = parser.add_mutually_exclusive_group(required=True)
+    src.add_argument("--data-device", help="Scratch block device to format")
+    src.add_argument(
+        "--loop-size",
+        help="Create loop devices backed by sparse files of this size (e.g. 20G)",
+    )
+    parser.add_argument(
+        "--image-dir",
+        help=(
+            "Directory for the loop device images (with --loop-size); must be "
+            "on the storage to tune, not tmpfs"
+        ),
+    )
+    parser.add_argument("--log-device", help="Scratch device for the external log")
+    parser.add_argument(
+        "--loop-log-size",
+        default="2G",
+        help="Size of the external log loop device (with --loop-size)",
+    )
+    parser.add_argument("--su-kb", type=int, nargs="+", default=DEFAULT_SU_KB)
+    parser.add_argument("--sw", type=int, nargs="+", default=DEFAULT_SW)
+    parser.add_argument("--log-size", nargs="+", default=DEFAULT_LOG_SIZE)
+    parser.add_argument("--logbsize", nargs="+", default=DEFAULT_LOGBSIZE)
+    parser.add_argument("--allocsize", nargs="+", default=DEFAULT_ALLOCSIZE)
+    parser.add_argument(
+        "--runtime", type=int, default=TUNER_RUNTIME, help="Seconds per fio workload"
+    )
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument(
+        "--output", help="Write the winning raid_fs.yml fragment to this file"
+    )
+    parser.add_argument("--label", default="nfsdata", help="Label for the preset fragment")
+    parser.add_argument("--target-data-device", default="/dev/xi_data")
+    parser.add_argument("--target-log-device", default="/dev/xi_log")
+    parser.add_argument("--target-mountpoint", default="/mnt/data")
+    parser.add_argument(
+        "-y", "--yes", action="store_true", help="Do not ask before formatting devices"
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true", help="Print commands without executing them"
+    )
+    args = parser.parse_args(argv)
+    if args.loop_size and not args.image_dir:
+        parser.error("--loop-size requires --image-dir")
+
+    candidates = candidate_grid(
+        args.su_kb, args.sw, args.log_size, args.logbsize, args.allocsize
+    )
+    print(f"{len(candidates)} candidate combinations")
+
+    if args.data_device and not (args.yes or args.dry_run):
+        devs = " ".join(d for d in (args.data_device, args.log_device) if d)
+        answer = input(f"All data on {devs} will be destroyed. Continue? [y/N]: ")
+        if answer.strip().lower() not in ("y", "yes"):
+            return 1
+
+    workdir = tempfile.mkdtemp(prefix="xfs_tuner.")
+    mountpoint = os.path.join(workdir, "mnt")
+    os.makedirs(mountpoint)
+    imagedir = tempfile.mkdtemp(prefix="xfs_tuner.", dir=args.image_dir) if args.loop_size else ""
+    loops: List[str] = []
+    try:
+        if args.loop_size:
+            data_dev = attach_loop(os.path.join(imagedir, "data.img"), args.loop_size, args.dry_run)
+            log_dev = attach_loop(
+                os.path.join(imagedir, "log.img"), args.loop_log_size, args.dry_run
+            )
+            loops = [data_dev, log_dev]
+        else:
+            data_dev, log_dev = args.data_device, args.log_device
+        reports = []
+        for cand in candidates:
+            print(f"Testing {cand.label} ...")
+            reports.append(
+                evaluate(
+                    cand, data_dev, log_dev, mountpoint, args.runtime, args.repeat, args.dry_run
+                )
+            )
+    except (OSError, subprocess.CalledProcessError) as exc:
+        print(f"tuning failed: {exc}", file=sys.stderr)
+        return 1
+    finally:
+        for dev in loops:
+            detach_loop(dev, args.dry_run)
+        if imagedir:
+            for name in ("data.img", "log.img"):
+                try:
+                    os.unlink(os.path.join(imagedir, name))
+                except OSError:
+                    pass
+        for path in (mountpoint, workdir, imagedir):
+            try:
+                if path:
+                    os.rmdir(path)
+            except OSError as exc:
+                # e.g. a candidate filesystem is still mounted
+                print(f"failed to remove {path}: {exc}", file=sys.stderr)
+
+    ranked = rank(reports)
+    print("Ranking:")
+    for rep in ranked:
+        print(f"  {rep.name}: score={rep.score:.3f} reasons={','.join(rep.reasons) or 'OK'}")
+    by_label = {c.label: c for c in candidates}
+    best = ranked[0]
+    if best.reasons:
+        print("No candidate completed successfully", file=sys.stderr)
+        return 1
+    fragment = preset_fragment(
+        by_label[best.name],
+        label=args.label,
+        data_device=args.target_data_device,
+        log_device=args.target_log_device,
+        mountpoint=args.target_mountpoint,
+    )
+    print()
+    print(fragment, end="")
+    if args.output:
+        with open(args.output, "w") as fh:
+            fh.write(fragment)
+    return 0
+
+
+if __name__ == "__main__":  # pragma: no cover - entrypoint
+    sys.exit(main())